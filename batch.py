@@ -0,0 +1,72 @@
+import sys
+
+from games.batch import BatchSummary, analyse, self_play, to_json_line
+from games.engines import ENGINES
+
+
+def usage():
+    print(f'Usage: python3 {sys.argv[0]} selfplay <engine> [-g <games>] [-m <max depth>] [-M <max depth>]')
+    print('                          [-t <seconds>] [-T <seconds>] [-n <plies>] [-s <seed>] [-j <jobs>] [-o <path>]')
+    print(f'       python3 {sys.argv[0]} analyse <engine> <file> [-m <max depth>] [-t <seconds>] [-j <jobs>] [-o <path>]')
+    print(f'    Engines: {", ".join(ENGINES)}')
+    print('    selfplay: play games of the AI against itself. Default options: -g 100 -m 5 -n 2 -s 0')
+    print('        -m, -t: search options of the first player, and of the second unless -M or -T are given')
+    print('        -M, -T: search options of the second player')
+    print('        -n: number of random moves at the start of each game')
+    print('    analyse: find the best move in each position in file, one per line,')
+    print('        written with the top row first using \'x\', \'o\' and \'.\' and optional \'/\' between rows.')
+    print('        \'x\' moved first. Default options: -m 5')
+    print('    -j: number of processes running games or positions at the same time')
+    print('    -o: write the results to this file instead of printing them')
+    print('    Results are written as one JSON object per line as they complete, followed by a summary.')
+
+def main():
+    # Check args for mode and engine arguments
+    mode, engine = sys.argv[1], sys.argv[2]
+    if mode not in ('selfplay', 'analyse'):
+        print(f'Unrecognized mode: {mode}')
+        usage()
+        sys.exit(0)
+    if engine not in ENGINES:
+        print(f'Unrecognized engine: {engine}')
+        usage()
+        sys.exit(0)
+
+    # Get optional values
+    time_limit = float(sys.argv[sys.argv.index('-t') + 1]) if '-t' in sys.argv else None
+    max_depth = int(sys.argv[sys.argv.index('-m') + 1]) if '-m' in sys.argv else (None if time_limit else 5)
+    jobs = int(sys.argv[sys.argv.index('-j') + 1]) if '-j' in sys.argv else 1
+
+    if mode == 'selfplay':
+        games = int(sys.argv[sys.argv.index('-g') + 1]) if '-g' in sys.argv else 100
+        second_time_limit = float(sys.argv[sys.argv.index('-T') + 1]) if '-T' in sys.argv else time_limit
+        second_max_depth = (int(sys.argv[sys.argv.index('-M') + 1]) if '-M' in sys.argv
+                            else (max_depth if '-T' not in sys.argv else None))
+        random_plies = int(sys.argv[sys.argv.index('-n') + 1]) if '-n' in sys.argv else 2
+        seed = int(sys.argv[sys.argv.index('-s') + 1]) if '-s' in sys.argv else 0
+        records = self_play(engine, games, (max_depth, second_max_depth), (time_limit, second_time_limit),
+                            random_plies, seed, jobs)
+        unit = 'games'
+    else:
+        with open(sys.argv[3]) as f:
+            positions = [line.strip() for line in f if line.strip()]
+        records = analyse(engine, positions, max_depth, time_limit, jobs)
+        unit = 'positions'
+
+    # Stream each result as soon as it completes
+    out = open(sys.argv[sys.argv.index('-o') + 1], 'w') if '-o' in sys.argv else sys.stdout
+    summary = BatchSummary()
+    try:
+        for record in records:
+            summary.add(record)
+            print(to_json_line(record), file=out, flush=True)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(summary.report(unit))
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or '-h' in sys.argv or 'help' in sys.argv:
+        usage()
+        sys.exit(0)
+    main()
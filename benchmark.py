@@ -0,0 +1,64 @@
+import json
+import sys
+
+from games import GameState
+from games.benchmark import POSITIONS, compare, run_benchmark
+from games.engines import ENGINES
+
+
+def usage():
+    print(f'Usage: python3 {sys.argv[0]} [-e <engine>] [-p <position>] [-s <seed>] [-n <repeat>] [-a <algorithm>] [-o <path>]')
+    print(f'       python3 {sys.argv[0]} --compare <old.json> <new.json>')
+    print('    Search a fixed set of positions to fixed depths with seeded move ordering,')
+    print('    and report the move, value, nodes and time of each search.')
+    print(f'    -e: only run this engine ({", ".join(ENGINES)}), may be repeated')
+    print(f'    -p: only run this position ({", ".join(name for name, *_ in POSITIONS)}), may be repeated')
+    print('    -s: seed for move ordering. Default: 0')
+    print('    -n: run each search this many times and keep the fastest. Default: 1')
+    print('    -a: search with this algorithm instead of each engine\'s default (alphabeta, negamax or pvs)')
+    print('    -o: save the results as JSON to compare with another run')
+    print('    --compare: compare two saved runs')
+
+def main():
+    if '--compare' in sys.argv:
+        index = sys.argv.index('--compare')
+        with open(sys.argv[index + 1]) as f:
+            old = json.load(f)
+        with open(sys.argv[index + 2]) as f:
+            new = json.load(f)
+        for line in compare(old, new):
+            print(line)
+        print(f"Total nodes {old['total_nodes']} -> {new['total_nodes']}, "
+              f"time {old['total_seconds']:.3f}s -> {new['total_seconds']:.3f}s")
+        return
+
+    # Get optional values
+    engines = [sys.argv[i + 1] for i, arg in enumerate(sys.argv) if arg == '-e']
+    positions = [sys.argv[i + 1] for i, arg in enumerate(sys.argv) if arg == '-p']
+    for engine in engines:
+        if engine not in ENGINES:
+            print(f'Unrecognized engine: {engine}')
+            usage()
+            sys.exit(0)
+    seed = int(sys.argv[sys.argv.index('-s') + 1]) if '-s' in sys.argv else 0
+    repeat = int(sys.argv[sys.argv.index('-n') + 1]) if '-n' in sys.argv else 1
+    algorithm = sys.argv[sys.argv.index('-a') + 1] if '-a' in sys.argv else None
+    if algorithm is not None and algorithm not in GameState.SEARCH_ALGORITHMS:
+        print(f'Unrecognized search algorithm: {algorithm}')
+        usage()
+        sys.exit(0)
+
+    results = run_benchmark(engines, positions, seed, repeat, algorithm=algorithm)
+    print(f"Total: {results['total_nodes']} nodes in {results['total_seconds']:.3f}s")
+
+    if '-o' in sys.argv:
+        path = sys.argv[sys.argv.index('-o') + 1]
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Saved results to {path}')
+
+if __name__ == '__main__':
+    if '-h' in sys.argv or 'help' in sys.argv:
+        usage()
+        sys.exit(0)
+    main()
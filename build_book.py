@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+from games.book import BOOK_DIR, build_book
+from play_game import board_dims, game_cls, load_game
+
+
+def usage():
+    print(f'Usage: python3 {sys.argv[0]} <game> [-n <plies>] [-m <max depth>] [-d <board size>] [-k <length>] [-g] [-t <seconds>] [-o <path>]')
+    print('    Search the AI\'s best move in every position up to <plies> moves into the game')
+    print('    and save them as the opening book that the game consults before searching.')
+    print('    Default options: -n 4, other options as in play_game.py')
+    print(f'    Default path: {BOOK_DIR}/<game>.book')
+
+def main():
+    # Check args for game argument
+    game = sys.argv[1]
+    if game not in game_cls:
+        print(f'Unrecognized game: {game}')
+        usage()
+        sys.exit(0)
+
+    # Get optional values
+    plies = int(sys.argv[sys.argv.index('-n') + 1]) if '-n' in sys.argv else 4
+    time_limit = float(sys.argv[sys.argv.index('-t') + 1]) if '-t' in sys.argv else None
+    max_depth = int(sys.argv[sys.argv.index('-m') + 1]) if '-m' in sys.argv else (None if time_limit else 5)
+    rows, cols = board_dims(sys.argv[sys.argv.index('-d') + 1]) if '-d' in sys.argv else (3, 3)
+    win_length = int(sys.argv[sys.argv.index('-k') + 1]) if '-k' in sys.argv else None
+    gravity = '-g' in sys.argv
+
+    # Create a Game with the player first, only to set up the board and options
+    game = load_game(game)(True, max_depth=max_depth, board_size=rows, rows=rows, cols=cols,
+                           win_length=win_length, gravity=gravity, use_book=False)
+    path = sys.argv[sys.argv.index('-o') + 1] if '-o' in sys.argv else os.path.join(BOOK_DIR, game.book_name() + '.book')
+
+    start = time.perf_counter()
+    size = build_book(game.gamestate_cls, game.board, game.kwargs, plies, path, time_limit)
+    print(f'Wrote {size} positions to {path} in {time.perf_counter() - start:.1f}s')
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or '-h' in sys.argv or 'help' in sys.argv:
+        usage()
+        sys.exit(0)
+    main()
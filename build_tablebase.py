@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+
+from games.book import BOOK_DIR
+from games.tablebase import Tablebase, build_tablebase
+from games.ttt import TTTGame
+
+
+def usage():
+    print(f'Usage: python3 {sys.argv[0]} [-d <board size>] [-k <length>] [-o <path>]')
+    print('    Work out the result of every Tic-Tac-Toe position by retrograde analysis and save')
+    print('    them as the tablebase that the game looks up instead of searching.')
+    print(f'    Boards may have at most {Tablebase.MAX_SPACES} spaces. Default options: -d 3, -k as in play_game.py')
+    print(f'    Default path: {BOOK_DIR}/ttt<board size>.tb')
+
+def main():
+    # Get optional values
+    board_size = int(sys.argv[sys.argv.index('-d') + 1]) if '-d' in sys.argv else 3
+    win_length = int(sys.argv[sys.argv.index('-k') + 1]) if '-k' in sys.argv else None
+    if board_size ** 2 > Tablebase.MAX_SPACES:
+        print(f'Boards with more than {Tablebase.MAX_SPACES} spaces are too large for a tablebase')
+        usage()
+        sys.exit(0)
+
+    # Create a Game with the player first, only to set up the options
+    game = TTTGame(True, board_size=board_size, win_length=win_length, use_book=False, use_tablebase=False)
+    path = sys.argv[sys.argv.index('-o') + 1] if '-o' in sys.argv else os.path.join(BOOK_DIR, game.book_name() + '.tb')
+
+    start = time.perf_counter()
+    size = build_tablebase(game.board_size, game.win_length, path)
+    print(f'Wrote {size} positions to {path} in {time.perf_counter() - start:.1f}s')
+
+if __name__ == '__main__':
+    if '-h' in sys.argv or 'help' in sys.argv:
+        usage()
+        sys.exit(0)
+    main()
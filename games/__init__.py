@@ -1,126 +1,614 @@
+import os
+import random
+import time
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, Generator, List, Optional, Tuple
 
-from typing import Any, Dict, Generator, List
+from games.ordering import MoveOrderer
+from games.stats import SearchStats
+from games.table import SOLVED_DEPTH, TranspositionTable, zobrist_keys
+
+# Process pools are only loaded when a search uses them, since importing them
+# takes longer than the rest of the game's startup
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time limit for a move runs out.
+    """
+
+
+class GameConfig():
+    """
+    Data shared by every state of a game with the same options, built once
+    per game instead of once per state:
+        kwargs: game-specific options
+        num_spaces: number of spaces on the board
+        keys, side_key: Zobrist keys for each (piece, space) and for the side to move
+        symmetries, inverses: index maps for each board symmetry used to
+            canonicalize table keys, and their inverses (empty without use_symmetry)
+    Games add their own precomputed tables in GameState.init_config.
+    """
+
+    def __init__(self, kwargs: Dict[str, Any], num_spaces: int):
+        self.kwargs = kwargs
+        self.num_spaces = num_spaces
+
+
+# Configs built so far, by state class, board size, options and use of symmetry
+_configs: Dict[tuple, GameConfig] = {}
+
+# Search algorithm and aspiration window of each state class before any game
+# changed them, so games without those options get the class's own defaults
+_search_defaults: Dict[type, Tuple[str, Optional[float]]] = {}
 
 
 class GameState():
     """
     Representation of a specific board state.
         player: the player (PLAYER or AI) that played last_move
-        board: the current board state
-        board_values: cache of known board values
+        board: the current board state, packed one byte per space
+        table: transposition table of known board values
         last_move: the index of the last move made by player
-        kwargs: game-specific options
+        config: data shared by all states of the game, including kwargs (game-specific options)
+        hash: Zobrist hash of board and player, updated incrementally from parent_hash
+        history: previous values of last_move, for undoing moves made by apply_move
+        sym_hashes: Zobrist hash of the board transformed by each of config.symmetries
+    States use __slots__, so subclasses list their own fields in __slots__ too.
     """
 
     PLAYER: int = 1
     AI: int = -1
     EMPTY: int = 0
 
-    player: int = None
-    board: Any = None
-    win: bool = False
-    tie: bool = False
-    ended: bool = False
-    last_move: int = -1
-    board_values: Dict[Any, float]
-
-
-    def __init__(self, player: int, board: Any, board_values: Dict[int, float],
-                 last_move: int = None, kwargs: Dict[str, Any] = None):
+    __slots__ = (
+        'player', 'board', 'table', 'last_move', 'config', 'hash', 'history',
+        'win', 'tie', 'ended', 'sym_hashes',
+        # Search state: move orderer, statistics (or None), current depth limit,
+        # time limit, nodes visited and heuristic values of the leaves below (or None)
+        'orderer', 'stats', 'depth_limit', 'deadline', 'nodes', 'leaf_values'
+    )
+
+    # Search algorithms
+    ALPHABETA: str = 'alphabeta'
+    NEGAMAX: str = 'negamax'
+    PVS: str = 'pvs'
+    SEARCH_ALGORITHMS: Tuple[str, ...] = (ALPHABETA, NEGAMAX, PVS)
+    # Width of the null window used by PVS, smaller than any difference between values
+    NULL_WINDOW: float = 1e-9
+
+    # Search options
+    max_depth: int = None
+    search_algorithm: str = ALPHABETA
+    # With iterative deepening, search each iteration with a window this wide
+    # around the previous iteration's value first (None searches the full window)
+    aspiration_window: float = None
+    # Share table entries between states that are symmetric to each other
+    use_symmetry: bool = True
+    # Evaluate the leaves below a state together with evaluate_leaves, where the game supports it
+    batch_leaves: bool = False
+
+
+    def __init__(self, player: int, board: Any, table: TranspositionTable,
+                 last_move: int = None, kwargs: Dict[str, Any] = None, parent_hash: int = None):
         self.player = player
-        self.board = board.copy()
-        self.board_values = board_values
+        self.board = array('b', board)
+        self.table = table
         self.last_move = last_move
-        self.kwargs = kwargs
-
-        self.hash = hash((tuple(self.board), player))
+        self.config = self.get_config(kwargs, len(board))
+        self.history = []
+        self.win, self.tie, self.ended = False, False, False
+        self.init_board()
 
         # Skip first move:
         if last_move == -1:
-            self.ended = False
+            self.hash = self.zobrist_hash()
+            self.init_symmetry()
             return
 
-        # Apply move
-        self.board[last_move] = self.player
+        # Apply move unless the board already contains it
+        if self.board[last_move] == self.EMPTY:
+            self.place(last_move)
+        if parent_hash is None:
+            self.hash = self.zobrist_hash()
+        else:
+            self.hash = self.update_hash(parent_hash, last_move)
+        self.init_symmetry()
+
+        # Check if last move ended the game
+        self.check_end()
 
     def __hash__(self) -> int:
         return self.hash
 
+    @classmethod
+    def get_config(cls, kwargs: Dict[str, Any], num_spaces: int) -> GameConfig:
+        """Shared config for states of this class with these options, built on first use.
+        """
+        key = (cls, num_spaces, tuple(sorted(kwargs.items())) if kwargs else (), cls.use_symmetry)
+        config = _configs.get(key)
+        if config is None:
+            config = GameConfig(kwargs, num_spaces)
+            config.keys, config.side_key = zobrist_keys(num_spaces, (cls.PLAYER, cls.AI))
+            if cls.use_symmetry:
+                config.symmetries, config.inverses = cls.symmetry_maps(config)
+            else:
+                config.symmetries, config.inverses = (), ()
+            cls.init_config(config)
+            _configs[key] = config
+        return config
+
+    @classmethod
+    def init_config(cls, config: GameConfig):
+        """Add any game-specific tables to config.
+        """
+
+    @property
+    def kwargs(self) -> Dict[str, Any]:
+        return self.config.kwargs
+
+    @property
+    def symmetries(self) -> Tuple[Tuple[int, ...], ...]:
+        return self.config.symmetries
+
+    @property
+    def inverses(self) -> Tuple[Tuple[int, ...], ...]:
+        return self.config.inverses
+
+    def zobrist_hash(self) -> int:
+        """Hash the board from scratch by XORing the key of every occupied space.
+        """
+        config = self.config
+        keys = config.keys
+        h = config.side_key if self.player == self.AI else 0
+        for index, piece in enumerate(self.board):
+            if piece != self.EMPTY:
+                h ^= keys[piece][index]
+        return h
+
+    def update_hash(self, parent_hash: int, index: int) -> int:
+        """Hash after player moved at index from a state hashed as parent_hash.
+        Only the moved piece and the side to move change, so this is constant-time.
+        """
+        config = self.config
+        return parent_hash ^ config.keys[self.player][index] ^ config.side_key
+
+    def init_board(self):
+        """Build any data derived from the board before the last move is applied.
+        """
+
+    def check_end(self):
+        """Set win, tie and ended for player's last move.
+        """
+        raise NotImplementedError
+
+    def place(self, index: int):
+        """Put player's piece on the board at index.
+        """
+        self.board[index] = self.player
+
+    def remove(self, index: int):
+        """Take player's piece at index off the board.
+        """
+        self.board[index] = self.EMPTY
+
+    def apply_move(self, index: int):
+        """Play index for the other player, updating this state in place.
+        """
+        self.history.append(self.last_move)
+        self.player = -self.player
+        self.last_move = index
+        self.place(index)
+        self.hash = self.update_hash(self.hash, index)
+        if self.sym_hashes:
+            self.update_sym_hashes(index)
+        self.check_end()
+
+    def undo_move(self):
+        """Take back the last move made by apply_move.
+        """
+        index = self.last_move
+        # XOR with the same keys restores the previous hash
+        self.hash = self.update_hash(self.hash, index)
+        if self.sym_hashes:
+            self.update_sym_hashes(index)
+        self.remove(index)
+        self.player = -self.player
+        self.last_move = self.history.pop()
+        # Moves are never applied to ended states
+        self.win, self.tie, self.ended = False, False, False
+
+    @classmethod
+    def symmetry_maps(cls, config: GameConfig) -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[Tuple[int, ...], ...]]:
+        """Index maps and their inverses for the board's symmetries, other than the identity.
+        """
+        return (), ()
+
+    def init_symmetry(self):
+        """Hash the board under each symmetry, so equivalent states share table entries.
+        """
+        config = self.config
+        keys = config.keys
+        board = self.board
+        sym_hashes = []
+        for symmetry in config.symmetries:
+            h = config.side_key if self.player == self.AI else 0
+            for index, piece in enumerate(board):
+                if piece != self.EMPTY:
+                    h ^= keys[piece][symmetry[index]]
+            sym_hashes.append(h)
+        # Packed as 64-bit ints, which take a quarter of the memory of Python ints
+        self.sym_hashes = array('Q', sym_hashes)
+
+    def update_sym_hashes(self, index: int):
+        """Update sym_hashes for player moving at (or taking back) index.
+        """
+        config = self.config
+        player_keys, side_key = config.keys[self.player], config.side_key
+        sym_hashes = self.sym_hashes
+        for i, symmetry in enumerate(config.symmetries):
+            sym_hashes[i] ^= player_keys[symmetry[index]] ^ side_key
+
+    def table_key(self) -> Tuple[int, int]:
+        """Canonical table key for this state: the smallest hash over all symmetries.
+        Returns (key, number of the symmetry that gives it, or -1 for the identity).
+        """
+        key, symmetry = self.hash, -1
+        for i, h in enumerate(self.sym_hashes):
+            if h < key:
+                key, symmetry = h, i
+        return key, symmetry
+
+    def next_state(self, index: int) -> 'GameState':
+        """Create the state reached when the other player plays index.
+        """
+        return type(self)(-self.player, self.board, self.table, index, self.kwargs, self.hash)
+
     def gen_indices(self) -> Generator[int, None, None]:
         """Generator of valid moves for AI.
         """
         raise NotImplementedError
 
+    def move_priority(self, index: int) -> float:
+        """Static preference for a move, used to order moves that are otherwise equal.
+        """
+        return 0
+
     def heuristic(self) -> float:
         """Approximate value of non-terminal state.
         """
         raise NotImplementedError
 
-    def get_best_move(self) -> int:
-        """Get the best move for the current player.
+    def evaluate_leaves(self, moves: List[int]) -> Optional[List[float]]:
+        """Heuristic values of the states reached by each of moves, indexed by
+        board index, or None to evaluate each state with heuristic instead.
         """
-        # Get the best move for the current player
-        return self._get_best_move(self, -2, 2, 0)[0]
+        return None
 
-    def _get_best_move(self, state, alpha, beta, depth):
-        """Recursive function for finding the best move in a state.
-        Implements alpha-beta pruning.
+    def leaf_heuristic(self) -> float:
+        """Heuristic value of a state at the depth limit, from the values its
+        parent evaluated for all its children if there are any.
+        """
+        # The parent state is this state with last_move undone
+        values = self.leaf_values
+        if values is not None:
+            return values[self.last_move]
+        return self.heuristic()
+
+    def get_best_move(self, time_limit: float = None, orderer: MoveOrderer = None,
+                      jobs: int = 1, executor: 'Executor' = None, stats: SearchStats = None) -> int:
+        """Get the best move for the current player.
+        With a time_limit (in seconds), search with iterative deepening instead.
+        orderer decides the order moves are searched in (a new MoveOrderer by default).
+        With jobs > 1, the root moves are searched in parallel by a process pool
+        (executor, or a temporary pool of jobs processes).
+        If stats is given, it collects counters about the search.
+        """
+        if jobs > 1:
+            # Imported here to avoid a circular import
+            from games.parallel import root_parallel_search
+            return root_parallel_search(self, jobs, time_limit, orderer, executor, stats)[0]
+        return self.search(time_limit, orderer, stats=stats)[0]
+
+    def search(self, time_limit: float = None, orderer: MoveOrderer = None, ply: int = 0,
+               alpha: float = -2, beta: float = 2, stats: SearchStats = None) -> Tuple[int, float]:
+        """Search this state, which is ply moves below the root of the search tree.
+        Values outside (alpha, beta) are only bounds on the true value.
+        Returns (best move, value).
+        """
+        start = time.perf_counter()
+        # Entries from earlier moves may be replaced by this search
+        self.table.new_search()
+        self.orderer = orderer or MoveOrderer()
+        self.orderer.new_search()
+        self.stats = stats
+        self.nodes = 0
+        self.leaf_values = None
+        if time_limit is not None:
+            best_move, best_value = self._iterative_deepening(time_limit, ply, alpha, beta)
+        else:
+            # Get the best move for the current player
+            # The search makes and unmakes moves on this state, leaving it unchanged
+            self.depth_limit, self.deadline = self.max_depth, None
+            best_move, best_value, _ = self._search_tree(alpha, beta, ply)
+
+        if stats is not None:
+            stats.nodes += self.nodes
+            stats.seconds += time.perf_counter() - start
+            self.stats = None
+        return best_move, best_value
+
+    def _iterative_deepening(self, time_limit: float, ply: int,
+                             alpha: float, beta: float) -> Tuple[int, float]:
+        """Search one ply deeper at a time until time_limit runs out.
+        Returns the best move and value from the deepest completed iteration.
+        """
+        deadline = time.perf_counter() + time_limit
+        root_moves = len(self.history)
+        best_move, best_value, depth = -1, 0, ply
+        while not self.max_depth or depth < self.max_depth:
+            depth += 1
+            # Always finish the first iteration so there is a move to return
+            self.depth_limit = depth
+            self.deadline = deadline if depth > ply + 1 else None
+            try:
+                window = self.aspiration_window
+                if window and depth > ply + 1:
+                    # Expect a value close to the previous iteration's
+                    low, high = max(alpha, best_value - window), min(beta, best_value + window)
+                    move, value, approximated = self._search_tree(low, high, ply)
+                    if (value <= low and low > alpha) or (value >= high and high < beta):
+                        # The value fell outside the window, so it is only a bound
+                        move, value, approximated = self._search_tree(alpha, beta, ply)
+                else:
+                    move, value, approximated = self._search_tree(alpha, beta, ply)
+                best_move, best_value = move, value
+            except SearchTimeout:
+                # Unwind the moves made by the interrupted iteration
+                while len(self.history) > root_moves:
+                    self.undo_move()
+                break
+            if not approximated:
+                # The search reached the end of the game on every line
+                break
+            if time.perf_counter() >= deadline:
+                break
+        self.deadline = None
+        return best_move, best_value
+
+    def _search_tree(self, alpha: float, beta: float, depth: int) -> Tuple[int, float, bool]:
+        """Search this state with search_algorithm.
+        Values and the window are from the AI's point of view whichever algorithm is used.
+        Returns (best move, value, whether value used the heuristic).
+        """
+        if self.search_algorithm == self.ALPHABETA:
+            return self._get_best_move(alpha, beta, depth)
+        if self.player == self.PLAYER:
+            # The AI is to move
+            return self._negamax(alpha, beta, depth)
+        best_move, best_value, approximated = self._negamax(-beta, -alpha, depth)
+        return best_move, -best_value, approximated
+
+    def _probe_table(self, alpha: float, beta: float, depth: int, remaining: int,
+                     sign: int) -> Tuple[int, int, int, float, float, bool, Optional[Tuple[int, float, bool]]]:
+        """Look up this state in the table for a search at depth with remaining
+        plies left. Values are from the AI's point of view if sign is 1, or the
+        player's if it is -1.
+        Returns (key, symmetry, hash move, alpha, beta, approximated, cutoff):
+        the table key and symmetry to store the result under, the stored best
+        move (or -1), the window narrowed by a stored bound, whether that bound
+        used the heuristic, and the search's result if the entry settles it (or None).
+        """
+        stats = self.stats
+        key, symmetry = self.table_key()
+        entry = self.table.lookup(key)
+        if stats is not None:
+            if entry is None:
+                stats.table_misses += 1
+            else:
+                stats.table_hits += 1
+        if entry is None:
+            return key, symmetry, -1, alpha, beta, False, None
+
+        value, flag, entry_depth, hash_move = entry
+        if symmetry != -1 and hash_move != -1:
+            # Map the stored move back from the canonical orientation
+            hash_move = self.config.inverses[symmetry][hash_move]
+        # A stored value is only usable if it was searched at least as deep
+        # The root needs a move, so it can only use an exact value stored with one
+        if entry_depth < remaining or (depth == 0 and (flag != TranspositionTable.EXACT or hash_move == -1)):
+            return key, symmetry, hash_move, alpha, beta, False, None
+
+        approximated = entry_depth < SOLVED_DEPTH
+        if sign < 0:
+            value, flag = -value, TranspositionTable.OPPOSITE[flag]
+        if flag == TranspositionTable.LOWER:
+            alpha = max(alpha, value)
+        elif flag == TranspositionTable.UPPER:
+            beta = min(beta, value)
+        if flag == TranspositionTable.EXACT or beta <= alpha:
+            if stats is not None:
+                stats.table_cutoffs += 1
+            return key, symmetry, hash_move, alpha, beta, approximated, (hash_move, value, approximated)
+        return key, symmetry, hash_move, alpha, beta, approximated, None
+
+    def _store_table(self, key: int, symmetry: int, best_move: int, best_value: float,
+                     alpha_orig: float, beta_orig: float, remaining: int, approximated: bool, sign: int):
+        """Store the result of a search of this state with the window
+        (alpha_orig, beta_orig) under key, from the point of view given by sign
+        as in _probe_table. Entries are always stored from the AI's point of view.
         """
-        if state.ended:
+        # Values outside the original window are only bounds on the true value
+        if best_value <= alpha_orig:
+            flag = TranspositionTable.UPPER
+        elif best_value >= beta_orig:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        stored_depth = remaining if approximated else SOLVED_DEPTH
+        stored_move = self.config.symmetries[symmetry][best_move] if symmetry != -1 else best_move
+        if sign < 0:
+            best_value, flag = -best_value, TranspositionTable.OPPOSITE[flag]
+        self.table.store(key, best_value, flag, stored_depth, stored_move)
+
+    def _get_best_move(self, alpha, beta, depth):
+        """Recursive function for finding the best move in this state.
+        Implements alpha-beta pruning with a transposition table.
+        Returns (best move, value, whether value used the heuristic).
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        stats = self.stats
+        if stats is not None and depth > stats.depth:
+            stats.depth = depth
+
+        if self.ended:
+            if stats is not None:
+                stats.terminals += 1
             # Terminal states are assigned a fixed-value
-            if state.tie:
+            if self.tie:
                 # Neither player wins
-                return (state.last_move, 0, False)
-            elif state.player == self.AI:
+                return (self.last_move, 0, False)
+            elif self.player == self.AI:
                 # AI wins
-                return (state.last_move, 1, False)
+                return (self.last_move, 1, False)
             else:
                 # Player wins
-                return (state.last_move, -1, False)
-        # Approximate value of non-terminal state at max_depth
-        elif self.max_depth and depth == self.max_depth:
-            return (state.last_move, state.heuristic(), True)
+                return (self.last_move, -1, False)
+        # Approximate value of non-terminal state at the depth limit
+        elif self.depth_limit and depth == self.depth_limit:
+            if stats is not None:
+                stats.heuristic_calls += 1
+            return (self.last_move, self.leaf_heuristic(), True)
+
+        # Check if the state's value has already been calculated
+        remaining = self.depth_limit - depth if self.depth_limit else SOLVED_DEPTH
+        alpha_orig, beta_orig = alpha, beta
+        key, symmetry, hash_move, alpha, beta, best_approximated, cutoff = self._probe_table(
+            alpha, beta, depth, remaining, 1)
+        if cutoff is not None:
+            return cutoff
+
         # Non-terminal states need to enumerate child states
-        elif state.player == self.PLAYER:
-            best_move, best_value, best_approximated = -1, -2, None
-            for index in self.gen_indices():
-                next_state = type(state)(self.AI, state.board, self.board_values, index, self.kwargs)
-                try:
-                    # Check if next state's value already has been calculated
-                    next_value = self.board_values[next_state]
-                except KeyError:
-                    # If not, save for future since tree traversal has overlapping nodes
-                    _, next_value, approximated = next_state._get_best_move(next_state, alpha, beta, depth + 1)
-                    if not approximated:
-                        self.board_values[next_state] = next_value
+        moves = self.orderer.order(self, depth, hash_move)
+        if self.batch_leaves and depth + 1 == self.depth_limit:
+            # Every child is at the depth limit, so evaluate them together
+            self.leaf_values = self.evaluate_leaves(moves)
+        if self.player == self.PLAYER:
+            best_move, best_value = -1, -2
+            for index in moves:
+                self.apply_move(index)
+                _, next_value, approximated = self._get_best_move(alpha, beta, depth + 1)
+                self.undo_move()
+                best_approximated = best_approximated or approximated
                 # Update best
                 if next_value > best_value:
-                    best_move, best_value, best_approximated = index, next_value, approximated
+                    best_move, best_value = index, next_value
                 alpha = max(alpha, best_value)
                 if beta <= alpha:
                     # Prune
+                    self.orderer.record_cutoff(self, index, depth, remaining)
+                    if stats is not None:
+                        stats.cutoffs[depth] = stats.cutoffs.get(depth, 0) + 1
                     break
-            return (best_move, best_value, best_approximated)
         else:
-            best_move, best_value, best_approximated = -1, 2, None
-            for index in self.gen_indices():
-                next_state = type(state)(self.PLAYER, state.board, self.board_values, index, self.kwargs)
-                try:
-                    # Check if next state's value already has been calculated
-                    next_value = self.board_values[next_state]
-                except KeyError:
-                    # If not, save for future since tree traversal has overlapping nodes
-                    _, next_value, approximated = next_state._get_best_move(next_state, alpha, beta, depth + 1)
-                    if not approximated:
-                        self.board_values[next_state] = next_value
+            best_move, best_value = -1, 2
+            for index in moves:
+                self.apply_move(index)
+                _, next_value, approximated = self._get_best_move(alpha, beta, depth + 1)
+                self.undo_move()
+                best_approximated = best_approximated or approximated
                 # Update best
                 if next_value < best_value:
-                    best_move, best_value, best_approximated = index, next_value, approximated
+                    best_move, best_value = index, next_value
                 beta = min(beta, best_value)
                 if beta <= alpha:
                     # Prune
+                    self.orderer.record_cutoff(self, index, depth, remaining)
+                    if stats is not None:
+                        stats.cutoffs[depth] = stats.cutoffs.get(depth, 0) + 1
                     break
-            return (best_move, best_value, best_approximated)
+        self.leaf_values = None
+
+        # Save for future since tree traversal has overlapping nodes
+        self._store_table(key, symmetry, best_move, best_value, alpha_orig, beta_orig,
+                          remaining, best_approximated, 1)
+        return (best_move, best_value, best_approximated)
+
+    def _negamax(self, alpha: float, beta: float, depth: int) -> Tuple[int, float, bool]:
+        """Negamax form of _get_best_move: values are from the point of view of the
+        player to move, so one loop serves both players.
+        With the PVS algorithm, moves after the first are searched with a null window
+        to prove they are no better than the best so far, and are only searched again
+        with the full window if they might be.
+        Table entries are stored from the AI's point of view, as _get_best_move does.
+        Returns (best move, value, whether value used the heuristic).
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        stats = self.stats
+        if stats is not None and depth > stats.depth:
+            stats.depth = depth
+
+        # 1 if the AI is to move, -1 if the player is
+        sign = 1 if self.player == self.PLAYER else -1
+        if self.ended:
+            if stats is not None:
+                stats.terminals += 1
+            # The player to move has lost, unless the game is tied
+            return (self.last_move, 0 if self.tie else -1, False)
+        # Approximate value of non-terminal state at the depth limit
+        elif self.depth_limit and depth == self.depth_limit:
+            if stats is not None:
+                stats.heuristic_calls += 1
+            return (self.last_move, sign * self.leaf_heuristic(), True)
+
+        # Check if the state's value has already been calculated
+        remaining = self.depth_limit - depth if self.depth_limit else SOLVED_DEPTH
+        alpha_orig, beta_orig = alpha, beta
+        key, symmetry, hash_move, alpha, beta, best_approximated, cutoff = self._probe_table(
+            alpha, beta, depth, remaining, sign)
+        if cutoff is not None:
+            return cutoff
+
+        # Non-terminal states need to enumerate child states
+        pvs = self.search_algorithm == self.PVS
+        moves = self.orderer.order(self, depth, hash_move)
+        if self.batch_leaves and depth + 1 == self.depth_limit:
+            # Every child is at the depth limit, so evaluate them together
+            self.leaf_values = self.evaluate_leaves(moves)
+        best_move, best_value = -1, -2
+        for number, index in enumerate(moves):
+            self.apply_move(index)
+            if number == 0 or not pvs:
+                _, value, approximated = self._negamax(-beta, -alpha, depth + 1)
+            else:
+                _, value, approximated = self._negamax(-alpha - self.NULL_WINDOW, -alpha, depth + 1)
+                if alpha < -value < beta:
+                    # The move may be better than the best so far, so find its value
+                    _, value, approximated = self._negamax(-beta, -alpha, depth + 1)
+            self.undo_move()
+            value = -value
+            best_approximated = best_approximated or approximated
+            # Update best
+            if value > best_value:
+                best_move, best_value = index, value
+            alpha = max(alpha, best_value)
+            if beta <= alpha:
+                # Prune
+                self.orderer.record_cutoff(self, index, depth, remaining)
+                if stats is not None:
+                    stats.cutoffs[depth] = stats.cutoffs.get(depth, 0) + 1
+                break
+        self.leaf_values = None
+
+        # Save for future since tree traversal has overlapping nodes
+        self._store_table(key, symmetry, best_move, best_value, alpha_orig, beta_orig,
+                          remaining, best_approximated, sign)
+        return (best_move, best_value, best_approximated)
 
 
 class Game():
@@ -134,13 +622,66 @@ class Game():
     board: Any = None
     ended: bool = False
     result: str = ''
-    board_values: Dict[Any, float] = {}
+    table: TranspositionTable = None
     kwargs: Dict[str, Any] = {}
+    time_limit: float = None
+    orderer: MoveOrderer = None
+    jobs: int = 1
+    executor: 'Executor' = None
+    book: Any = None
+    show_stats: bool = False
+    ponderer: Any = None
     markers: Dict[int, str]
 
-    def __init__(self, player_first: bool):
-        # Create dictionary for remembering value of particular board states
-        self.board_values = {}
+    def __init__(self, player_first: bool, time_limit: float = None, randomize: bool = False,
+                 seed: int = None, jobs: int = 1, use_book: bool = True, show_stats: bool = False,
+                 table_size: int = None, table_bytes: int = None, search_algorithm: str = None,
+                 aspiration_window: float = None, ponder: bool = False, batch_leaves: bool = False, **kwargs):
+        # kwargs holds options for other games, which are ignored
+        # Search options override the game's defaults when given
+        # They are set on the state class, like max_depth, so they are set for every game
+        if search_algorithm is not None and search_algorithm not in GameState.SEARCH_ALGORITHMS:
+            raise ValueError(f'Unrecognized search algorithm: {search_algorithm}')
+        cls = self.gamestate_cls
+        default_algorithm, default_window = _search_defaults.setdefault(
+            cls, (cls.search_algorithm, cls.aspiration_window))
+        cls.search_algorithm = search_algorithm if search_algorithm is not None else default_algorithm
+        cls.aspiration_window = aspiration_window if aspiration_window is not None else default_window
+        cls.batch_leaves = batch_leaves
+
+        # Seconds the AI may spend on each move, or None to search to max_depth
+        self.time_limit = time_limit
+
+        # Move ordering is kept between turns; randomize breaks ties between equal moves
+        self.orderer = MoveOrderer(random.Random(seed) if randomize else None)
+
+        # Number of processes searching each move, started with the first search
+        self.jobs = jobs
+        self.executor = None
+
+        # Print search statistics after each of the AI's moves
+        self.show_stats = show_stats
+
+        # Search the player's likely moves while they choose one, if pondering
+        # Processes started by jobs search with tables of their own, so they cannot use it
+        self.ponderer = None
+        if ponder and jobs <= 1:
+            # Imported here to avoid a circular import
+            from games.ponder import Ponderer
+            self.ponderer = Ponderer(time_limit)
+
+        # Create table for remembering value of particular board states
+        # Its size is fixed up front, in entries or bytes, so memory use does not grow during the game
+        self.table = TranspositionTable(table_size, table_bytes)
+
+        # Answer opening moves from the book instead of searching, if one has been built
+        self.book = None
+        if use_book:
+            # Imported here to avoid a circular import
+            from games.book import BOOK_DIR, OpeningBook
+            path = os.path.join(BOOK_DIR, self.book_name() + '.book')
+            if os.path.exists(path):
+                self.book = OpeningBook(path)
 
         # Map player to correct marker
         if player_first:
@@ -165,6 +706,11 @@ class Game():
             else:
                 self.result = 'You win!'
 
+    def book_name(self) -> str:
+        """Name of the opening book file for this game and its options.
+        """
+        raise NotImplementedError
+
     def move_is_valid(cls, move: int) -> bool:
         """Check that move choice is valid.
         """
@@ -181,16 +727,27 @@ class Game():
         self.board[move] = marker
 
         # Check if the game has ended
-        next_state = self.gamestate_cls(marker, self.board, self.board_values, move, self.kwargs)
+        next_state = self.gamestate_cls(marker, self.board, self.table, move, self.kwargs)
         self.handle_next_state(next_state, ai_turn)
 
         # Have AI take its turn after the player
         if not self.ended and not ai_turn:
             self.ai_turn()
 
+    def start_pondering(self):
+        """Search the player's likely moves in the background until they play one.
+        """
+        if self.ponderer is not None and not self.ended:
+            self.ponderer.start(self)
+
     def player_turn(self, move: int):
         """Create new board state from current state and player's move.
         """
+        if self.ponderer is not None:
+            # The AI's search uses the table next, so the background search must finish first
+            self.ponderer.stop()
+            if self.show_stats:
+                print(self.ponderer.report(move))
         self.take_turn(move, False)
 
     def ai_turn(self):
@@ -201,11 +758,35 @@ class Game():
         print('My turn! Thinking...')
 
         # Find best move for AI in this state
-        this_state = self.gamestate_cls(GameState.PLAYER, self.board, self.board_values, -1, self.kwargs)
-        ai_move = this_state.get_best_move()
+        this_state = self.gamestate_cls(GameState.PLAYER, self.board, self.table, -1, self.kwargs)
+        stats = SearchStats() if self.show_stats else None
+        ai_move = self.find_move(this_state, stats)
+        # Moves looked up instead of searched have no search statistics
+        if stats is not None and stats.nodes:
+            print(stats.report())
+            table = self.table
+            print(f'Memory: {len(table)} of {table.capacity} table entries used, '
+                  f'{table.nbytes / (1 << 20):.1f} MB in all')
 
         self.take_turn(ai_move, True)
 
+    def find_move(self, state: GameState, stats: SearchStats = None) -> int:
+        """Look up the AI's best move in state in the opening book, or search for
+        it, collecting statistics in stats if given.
+        Games with exact answers, such as tablebases, check them before calling
+        this, since the book's moves come from depth-limited searches.
+        """
+        move = self.book.lookup(state) if self.book else -1
+        if move != -1:
+            if self.show_stats:
+                print('Opening book move')
+            return move
+        if self.jobs > 1 and self.executor is None:
+            # Imported here to keep startup fast when searching in one process
+            from concurrent.futures import ProcessPoolExecutor
+            self.executor = ProcessPoolExecutor(self.jobs)
+        return state.get_best_move(self.time_limit, self.orderer, self.jobs, self.executor, stats)
+
     def print_board(self, print_indices=True):
         """ Print the game board.
         """
@@ -0,0 +1,178 @@
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from games import GameState
+from games.engines import ENGINES, parse_board
+from games.ordering import MoveOrderer
+from games.stats import SearchStats
+from games.table import TranspositionTable
+
+
+def mover_view(board: List[int], first: bool) -> List[int]:
+    """Board with the pieces of the player to move as the AI's pieces.
+    The first player's pieces are GameState.PLAYER pieces, so the board is
+    flipped when it is their turn. Searching the view for the AI then finds
+    the best move for whichever player is to move.
+    """
+    return [-piece for piece in board] if first else list(board)
+
+
+def search_move(gamestate_cls: type, kwargs: Dict[str, Any], board: List[int], first: bool,
+                table: TranspositionTable, orderer: MoveOrderer, max_depth: Optional[int],
+                time_limit: Optional[float], stats: SearchStats) -> Tuple[int, float]:
+    """Best move and its value for the player to move on board.
+    """
+    gamestate_cls.max_depth = max_depth
+    state = gamestate_cls(GameState.PLAYER, mover_view(board, first), table, -1, kwargs)
+    return state.search(time_limit, orderer, stats=stats)
+
+
+def play_self_game(engine: str, max_depths: Tuple[Optional[int], Optional[int]],
+                   time_limits: Tuple[Optional[float], Optional[float]],
+                   random_plies: int, seed: int) -> Dict[str, Any]:
+    """Play one game of the AI against itself and return its record.
+    The first and second player search with their own max depth, time limit and table.
+    The first random_plies moves are chosen at random, so games from different
+    seeds start from different positions; the seed also breaks ties between equal moves.
+    """
+    gamestate_cls, kwargs, spaces, _ = ENGINES[engine]
+    rand = random.Random(seed)
+    board = [GameState.EMPTY] * spaces
+    tables = (TranspositionTable(), TranspositionTable())
+    orderers = (MoveOrderer(random.Random(rand.random())), MoveOrderer(random.Random(rand.random())))
+    stats = (SearchStats(), SearchStats())
+
+    moves, result = [], 'tie'
+    while True:
+        side = len(moves) % 2
+        first = side == 0
+        if len(moves) < random_plies:
+            state = gamestate_cls(GameState.PLAYER, mover_view(board, first), tables[side], -1, kwargs)
+            move = rand.choice(list(state.gen_indices()))
+        else:
+            move = search_move(gamestate_cls, kwargs, board, first, tables[side], orderers[side],
+                               max_depths[side], time_limits[side], stats[side])[0]
+
+        # Play the move and check if it ends the game, as Game.take_turn does
+        marker = GameState.PLAYER if first else GameState.AI
+        board[move] = marker
+        moves.append(move)
+        state = gamestate_cls(marker, board, tables[side], move, kwargs)
+        if state.ended:
+            if state.win:
+                result = 'first' if first else 'second'
+            break
+
+    return {
+        'seed': seed,
+        'result': result,
+        'moves': moves,
+        'nodes': [stats[0].nodes, stats[1].nodes],
+        'seconds': [round(stats[0].seconds, 6), round(stats[1].seconds, 6)],
+    }
+
+
+def analyse_position(engine: str, position: str, max_depth: Optional[int],
+                     time_limit: Optional[float]) -> Dict[str, Any]:
+    """Best move for the player to move in a position, written as in the
+    benchmark corpus on one line, with optional '/' between rows.
+    'x' moved first, so it is 'x' to move if both players have as many pieces.
+    The value is from the point of view of the player to move.
+    """
+    gamestate_cls, kwargs, spaces, _ = ENGINES[engine]
+    try:
+        board = parse_board(position.replace('/', ' '))
+    except KeyError as e:
+        return {'position': position, 'error': f'Unrecognized piece: {e.args[0]}'}
+    if len(board) != spaces:
+        return {'position': position, 'error': f'Expected {spaces} spaces, got {len(board)}'}
+    first = board.count(GameState.PLAYER) == board.count(GameState.AI)
+
+    stats = SearchStats()
+    move, value = search_move(gamestate_cls, kwargs, board, first, TranspositionTable(),
+                              MoveOrderer(), max_depth, time_limit, stats)
+    return {
+        'position': position,
+        'to_move': 'x' if first else 'o',
+        'move': move,
+        'value': value,
+        'nodes': stats.nodes,
+        'seconds': round(stats.seconds, 6),
+    }
+
+
+def run_tasks(task: Callable, arguments: List[Tuple], jobs: int = 1) -> Iterator[Dict[str, Any]]:
+    """Run task once per tuple of arguments and yield the results as they complete.
+    With jobs > 1 the tasks are spread over a pool of jobs processes,
+    so results may arrive out of order.
+    """
+    if jobs <= 1:
+        for args in arguments:
+            yield task(*args)
+        return
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = [executor.submit(task, *args) for args in arguments]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def self_play(engine: str, games: int, max_depths: Tuple[Optional[int], Optional[int]],
+              time_limits: Tuple[Optional[float], Optional[float]] = (None, None),
+              random_plies: int = 0, seed: int = 0, jobs: int = 1) -> Iterator[Dict[str, Any]]:
+    """Play games of the AI against itself, yielding each game's record as it completes.
+    Game number i uses seed + i, so any game can be replayed on its own.
+    """
+    arguments = [(engine, max_depths, time_limits, random_plies, seed + number) for number in range(games)]
+    for record in run_tasks(play_self_game, arguments, jobs):
+        record['game'] = record['seed'] - seed
+        yield record
+
+
+def analyse(engine: str, positions: List[str], max_depth: Optional[int],
+            time_limit: Optional[float] = None, jobs: int = 1) -> Iterator[Dict[str, Any]]:
+    """Analyse positions, yielding each result as it completes.
+    """
+    arguments = [(engine, position, max_depth, time_limit) for position in positions]
+    yield from run_tasks(analyse_position, arguments, jobs)
+
+
+class BatchSummary():
+    """
+    Running totals over the records of a batch, for printing at the end.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.count = 0
+        self.results: Dict[str, int] = {'first': 0, 'second': 0, 'tie': 0}
+        self.errors = 0
+        self.nodes = 0
+
+    def add(self, record: Dict[str, Any]):
+        self.count += 1
+        if 'error' in record:
+            self.errors += 1
+            return
+        if 'result' in record:
+            self.results[record['result']] += 1
+            self.nodes += sum(record['nodes'])
+        else:
+            self.nodes += record['nodes']
+
+    def report(self, unit: str) -> str:
+        seconds = time.perf_counter() - self.start
+        lines = [f'{self.count} {unit} in {seconds:.1f}s ({self.count / seconds if seconds else 0:.1f}/s), '
+                 f'{self.nodes} nodes']
+        if any(self.results.values()):
+            lines.append(f"First player won {self.results['first']}, second player won {self.results['second']}, "
+                         f"{self.results['tie']} ties")
+        if self.errors:
+            lines.append(f'{self.errors} errors')
+        return '\n'.join(lines)
+
+
+def to_json_line(record: Dict[str, Any]) -> str:
+    return json.dumps(record, separators=(',', ':'))
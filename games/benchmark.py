@@ -0,0 +1,220 @@
+import platform
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from games import GameState
+from games.engines import ENGINES, parse_board
+from games.ordering import MoveOrderer
+from games.stats import SearchStats
+from games.table import TranspositionTable
+
+# Fixed positions where it is the AI's turn, drawn with the top row first:
+# 'x' is the player, 'o' is the AI and '.' is empty.
+# Each position is searched to every depth listed, where None searches to the end of the game.
+POSITIONS: List[Tuple[str, List[str], str, List[Optional[int]]]] = [
+    ('ttt3-empty', ['ttt3'], """
+        ...
+        ...
+        ...
+    """, [None]),
+    ('ttt3-corner', ['ttt3'], """
+        x..
+        ...
+        ...
+    """, [None]),
+    ('ttt3-fork', ['ttt3'], """
+        x..
+        .o.
+        ..x
+    """, [None]),
+    ('ttt4-midgame', ['ttt4'], """
+        x..o
+        .xo.
+        ....
+        x...
+    """, [4, None]),
+    ('ttt4-endgame', ['ttt4'], """
+        xo.x
+        .xo.
+        o.x.
+        x..o
+    """, [None]),
+    ('ttt5k4-opening', ['ttt5k4'], """
+        .....
+        .x...
+        ..o..
+        ..x..
+        .....
+    """, [3, 5]),
+    ('connect7x8-opening', ['connect7x8'], """
+        ........
+        ........
+        ........
+        ........
+        ........
+        ...o....
+        ...xx...
+    """, [4, 6]),
+    ('gomoku15-opening', ['gomoku15'], """
+        ...............
+        ...............
+        ...............
+        ...............
+        ...............
+        ...............
+        ......x........
+        .......o.......
+        .......x.......
+        ...............
+        ...............
+        ...............
+        ...............
+        ...............
+        ...............
+    """, [2]),
+    ('c4-empty', ['c4', 'c4-bitboard'], """
+        .......
+        .......
+        .......
+        .......
+        .......
+        .......
+    """, [4, 6, 8]),
+    ('c4-center', ['c4', 'c4-bitboard'], """
+        .......
+        .......
+        .......
+        .......
+        .......
+        ...x...
+    """, [4, 6, 8]),
+    ('c4-opening', ['c4', 'c4-bitboard'], """
+        .......
+        .......
+        .......
+        ...x...
+        ..xo...
+        ..ox...
+    """, [4, 6, 8]),
+    ('c4-threats', ['c4', 'c4-bitboard'], """
+        .......
+        .......
+        ...o...
+        ..xx...
+        ..ox.o.
+        .xoxxo.
+    """, [4, 6, 8]),
+    ('c4-endgame', ['c4', 'c4-bitboard'], """
+        ...x..o
+        o..o..x
+        x..o..o
+        x..ox.x
+        oo.xoxo
+        oxxxoxx
+    """, [4, 8, None]),
+]
+
+def run_position(gamestate_cls: type, kwargs: Dict[str, Any], board: List[int],
+                 depth: Optional[int], seed: int, repeat: int = 1,
+                 algorithm: str = None) -> Dict[str, Any]:
+    """Search board to depth with a fresh table and seeded move ordering,
+    using algorithm instead of the game's search algorithm if given.
+    The search is run repeat times and the fastest time is kept;
+    the counters are the same for every run.
+    """
+    previous_depth, previous_algorithm = gamestate_cls.max_depth, gamestate_cls.search_algorithm
+    gamestate_cls.max_depth = depth
+    gamestate_cls.search_algorithm = algorithm or previous_algorithm
+    try:
+        best_seconds = None
+        for _ in range(repeat):
+            table = TranspositionTable()
+            orderer = MoveOrderer(random.Random(seed))
+            state = gamestate_cls(GameState.PLAYER, board, table, -1, kwargs)
+            stats = SearchStats()
+            move, value = state.search(orderer=orderer, stats=stats)
+            if best_seconds is None or stats.seconds < best_seconds:
+                best_seconds = stats.seconds
+    finally:
+        gamestate_cls.max_depth = previous_depth
+        gamestate_cls.search_algorithm = previous_algorithm
+
+    return {
+        'move': move,
+        'value': value,
+        'nodes': stats.nodes,
+        'leaves': stats.leaves,
+        'table_hits': stats.table_hits,
+        'seconds': round(best_seconds, 6),
+        'nodes_per_second': round(stats.nodes / best_seconds) if best_seconds else 0,
+    }
+
+
+def run_benchmark(engines: List[str] = None, positions: List[str] = None, seed: int = 0,
+                  repeat: int = 1, verbose: bool = True, algorithm: str = None) -> Dict[str, Any]:
+    """Search every position in the corpus with every engine it lists.
+    engines and positions restrict the run to those names.
+    algorithm replaces each engine's default search algorithm.
+    Returns the results in a form that can be saved as JSON.
+    """
+    results = []
+    for name, position_engines, drawing, depths in POSITIONS:
+        if positions and name not in positions:
+            continue
+        board = parse_board(drawing)
+        for engine in position_engines:
+            if engines and engine not in engines:
+                continue
+            gamestate_cls, kwargs, _, _ = ENGINES[engine]
+            for depth in depths:
+                result = {'position': name, 'engine': engine, 'depth': depth}
+                result.update(run_position(gamestate_cls, kwargs, board, depth, seed, repeat, algorithm))
+                results.append(result)
+                if verbose:
+                    print(format_result(result))
+
+    return {
+        'python': platform.python_version(),
+        'seed': seed,
+        'repeat': repeat,
+        'algorithm': algorithm,
+        'total_nodes': sum(result['nodes'] for result in results),
+        'total_seconds': round(sum(result['seconds'] for result in results), 6),
+        'results': results,
+    }
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    """One line summary of a result.
+    """
+    depth = 'end' if result['depth'] is None else result['depth']
+    return (f"{result['position']:<14} {result['engine']:<12} depth {depth:<4} "
+            f"move {result['move']:<3} value {result['value']:+.3f} "
+            f"{result['nodes']:>9} nodes {result['seconds']:>9.4f}s")
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Lines comparing two benchmark runs, matched by position, engine and depth.
+    Changed moves are flagged, since a search change should not change the
+    value of a position searched to the same depth.
+    """
+    def key(result):
+        return (result['position'], result['engine'], result['depth'])
+
+    old_results = {key(result): result for result in old['results']}
+    lines = []
+    for result in new['results']:
+        before = old_results.get(key(result))
+        if before is None:
+            continue
+        depth = 'end' if result['depth'] is None else result['depth']
+        time_ratio = result['seconds'] / before['seconds'] if before['seconds'] else 0.0
+        line = (f"{result['position']:<14} {result['engine']:<12} depth {depth:<4} "
+                f"nodes {before['nodes']:>9} -> {result['nodes']:<9} "
+                f"time {before['seconds']:.4f}s -> {result['seconds']:.4f}s ({time_ratio:.2f}x)")
+        if result['move'] != before['move']:
+            line += f" move {before['move']} -> {result['move']}"
+        if result['value'] != before['value']:
+            line += f" value {before['value']:+.3f} -> {result['value']:+.3f}"
+        lines.append(line)
+    return lines
@@ -0,0 +1,118 @@
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, List, Tuple
+
+from games import GameState
+from games.ordering import MoveOrderer
+from games.table import TranspositionTable
+
+# Directory searched for the default book of each game
+BOOK_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'books')
+
+
+class OpeningBook():
+    """
+    Read-only, memory-mapped file of best moves for the AI in opening positions.
+    The file is a header followed by records sorted by key:
+        header: magic bytes, format version, number of records
+        record: canonical table key of the state (see GameState.table_key)
+                and the best move, in the canonical orientation
+    Lookups binary search the mapped file, so nothing is loaded up front.
+    """
+
+    MAGIC: bytes = b'SGBK'
+    VERSION: int = 1
+    HEADER = struct.Struct('<4sII')
+    RECORD = struct.Struct('<QH')
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size = self.HEADER.unpack_from(self.data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f'Not an opening book: {path}')
+
+    def __len__(self) -> int:
+        return self.size
+
+    def lookup(self, state: GameState) -> int:
+        """Best move for the player to move in state, or -1 if it is not in the book.
+        """
+        key, symmetry = state.table_key()
+        data, record, offset = self.data, self.RECORD, self.HEADER.size
+        low, high = 0, self.size
+        while low < high:
+            mid = (low + high) // 2
+            mid_key, move = record.unpack_from(data, offset + mid * record.size)
+            if mid_key < key:
+                low = mid + 1
+            elif mid_key > key:
+                high = mid
+            else:
+                if symmetry != -1:
+                    # Map the stored move back from the canonical orientation
+                    move = state.inverses[symmetry][move]
+                # Guard against hash collisions with positions not in the book
+                return move if move in state.gen_indices() else -1
+        return -1
+
+    @classmethod
+    def write(cls, path: str, moves: Dict[int, int]):
+        """Write a book file from a map of canonical table key to best move.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(moves)))
+            for key in sorted(moves):
+                f.write(cls.RECORD.pack(key, moves[key]))
+
+
+def collect_positions(state: GameState, plies: int, seen: set, positions: List[Tuple[List[int], int]]):
+    """Add every position reachable from state within plies moves where it
+    is the AI's turn to positions, as (board, player) pairs.
+    Positions equivalent by symmetry are only added once.
+    """
+    key = state.table_key()[0]
+    if state.ended or key in seen:
+        return
+    seen.add(key)
+    if state.player == GameState.PLAYER:
+        positions.append((list(state.board), state.player))
+    if plies == 0:
+        return
+    for index in list(state.gen_indices()):
+        state.apply_move(index)
+        collect_positions(state, plies - 1, seen, positions)
+        state.undo_move()
+
+
+def build_book(gamestate_cls: type, board: List[int], kwargs: Dict[str, Any], plies: int,
+               path: str, time_limit: float = None, verbose: bool = True) -> int:
+    """Search the AI's best move in every position up to plies moves into the
+    game, whether the AI moves first or second, and write them to path.
+    Returns the number of positions in the book.
+    """
+    table = TranspositionTable()
+    positions, seen = [], set()
+    for player in (GameState.PLAYER, GameState.AI):
+        root = gamestate_cls(player, board, table, -1, kwargs)
+        collect_positions(root, plies, seen, positions)
+
+    moves = {}
+    orderer = MoveOrderer()
+    start = time.perf_counter()
+    for number, (position, player) in enumerate(positions, 1):
+        state = gamestate_cls(player, position, table, -1, kwargs)
+        key, symmetry = state.table_key()
+        move = state.get_best_move(time_limit, orderer)
+        moves[key] = state.symmetries[symmetry][move] if symmetry != -1 else move
+        if verbose and (number % 100 == 0 or number == len(positions)):
+            print(f'{number}/{len(positions)} positions ({time.perf_counter() - start:.1f}s)')
+
+    OpeningBook.write(path, moves)
+    return len(moves)
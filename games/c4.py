@@ -1,8 +1,11 @@
-
-import random
+import time
+from array import array
 from typing import Any, Dict, Generator, List, Tuple
 
-from games import Game, GameState
+from games import Game, GameConfig, GameState, SearchTimeout
+from games.lines import board_symmetries, line_tables
+from games.stats import SearchStats
+from games.table import TranspositionTable
 
 
 class C4GameState(GameState):
@@ -12,160 +15,109 @@ class C4GameState(GameState):
     board: the current board state
     board_size: the number of spaces per row (and col)
     last_move: the index of the last move made by player
+    window_counts: number of pieces each player has in each window of four spaces
+    num_threats: number of empty spaces that would complete a four for each player
     """
 
-    # Map containing the index changes for travelling in each direction
-    direction_step_map = {
-        0: 1,
-        1: -6,
-        2: -7,
-        3: -8,
-        4: -1,
-        5: 6,
-        6: 7,
-        7: 8
-    }
-
-    # Map from each axis (positive direction) to the list of possible start indices
-    axis_start_map = {
-        0: {0, 7, 14, 21, 28, 35},
-        1: {21, 28, 35, 36, 37, 38},
-        2: {35, 36, 37, 38, 39, 40, 41},
-        3: {27, 34, 41, 40, 39, 38}
-    }
+    __slots__ = ('window_counts', 'threat_counts', 'num_threats')
+
+    search_algorithm = GameState.PVS
+
+    @classmethod
+    def init_config(cls, config: GameConfig):
+        """Precompute the windows of four spaces, shared by all states.
+        """
+        config.windows, config.cell_windows = line_tables(6, 7, 4)
 
     def check_win(self) -> bool:
         """Check if player's last move at index ends the game.
+        """
+        # Only the windows through the last move can have become a four
+        counts = self.window_counts[self.player]
+        return any(counts[number] == 4 for number in self.config.cell_windows[self.last_move])
 
-        Directions:
-            3  2  1
-             \ | /
-           4 - i - 0
-             / | \\
-            5  6  7
+    def init_board(self):
+        """Count pieces per window of four spaces, and the empty spaces that
+        would complete a four for each player, so heuristic is constant-time.
         """
-        board, player, index = self.board, self.player, self.last_move
-        # Track which directions can still be expanded
-        active = {dir: (True, index) for dir in self.direction_step_map}
-        # Track the current length along each direction axis
-        lengths = {axis: 1 for axis in range(0, 4)}
-        # Count number of inactive directions
-        inactive = 0
-
-        while inactive < 8:
-            for direction, step in self.direction_step_map.items():
-                dir_active, dir_index = active[direction]
-                if not dir_active:
-                    # Skip inactive direction
-                    continue
-
-                # Step to next index in current direction
-                prev_c, prev_r = dir_index % 7, dir_index // 7
-                dir_index += step
-                c, r = dir_index % 7, dir_index // 7
-
-                try:
-                    if abs(r - prev_r) > 1 or abs(c - prev_c) > 1:
-                        # Index wrapped around board
-                        raise IndexError
-                    elif not (0 <= dir_index < len(board)):
-                        # Index extends off of board
-                        raise IndexError
-                    elif board[dir_index] != player:
-                        # Current index matches other player
-                        raise ValueError
-                    else:
-                        # Increase length along axis and store index for next loop
-                        lengths[direction % 4] += 1
-                        dir_active = True
-                except (IndexError, ValueError):
-                    # Mark direction as inactive
-                    inactive += 1
-                    dir_active = False
-                active[direction] = (dir_active, dir_index)
-
-        return any(length >= 4 for length in lengths.values())
-
-
-    def count_threes(self) -> Tuple[int, int]:
-        """Count the number of potential wins for (player, other).
+        windows = self.config.windows
+        self.window_counts = {
+            GameState.PLAYER: array('B', [0]) * len(windows),
+            GameState.AI: array('B', [0]) * len(windows)
+        }
+        for number, window in enumerate(windows):
+            for index in window:
+                piece = self.board[index]
+                if piece != GameState.EMPTY:
+                    self.window_counts[piece][number] += 1
+
+        # Number of windows each empty space would complete, and number of such spaces
+        self.threat_counts = {GameState.PLAYER: array('B', [0]) * 42, GameState.AI: array('B', [0]) * 42}
+        self.num_threats = {GameState.PLAYER: 0, GameState.AI: 0}
+        for number, window in enumerate(windows):
+            for piece in (GameState.PLAYER, GameState.AI):
+                if self.window_counts[piece][number] == 3 and self.window_counts[-piece][number] == 0:
+                    empty = next(index for index in window if self.board[index] == GameState.EMPTY)
+                    self._add_threat(piece, empty, 1)
+
+    def _add_threat(self, piece: int, index: int, change: int):
+        """Add change to the number of windows that piece would complete by playing index.
         """
-        board, player = self.board, self.player
-
-        # Track location of last empty index
-        # If a potential four is found, it is the only empty space remaining
-        empty_index = -1
-        # Track set of empty indices that could be part of a four for each player
-        player_counted, other_counted = set(), set()
-        for axis, starts in self.axis_start_map.items():
-            step = self.direction_step_map[axis]
-            for start in starts:
-                # Count how many player pieces are in the first window of four spaces
-                num_player, num_other = 0, 0
-                end = start + 3 * step
-                for index in range(4):
-                    piece = board[start + index * step]
-                    if piece == player:
-                        num_player += 1
-                    elif piece == GameState.EMPTY:
-                        empty_index = index
-                    else:
-                        num_other += 1
-
-                while True:
-                    # Check if current window could have a winning line for the player
-                    if num_other == 0 and num_player == 3:
-                        # New position where player could win
-                        player_counted.add(empty_index)
-                    elif num_other == 3 and num_player == 0:
-                        # New position where other could win
-                        other_counted.add(empty_index)
-
-                    # Remove count for old item in window
-                    old_piece = board[start]
-                    if old_piece == player:
-                        num_player -= 1
-                    elif old_piece != GameState.EMPTY:
-                        num_other -= 1
-
-                    # Advance the window by one space
-                    prev_c, prev_r = end % 7, end // 7
-                    start += step
-                    end += step
-                    c, r = end % 7, end // 7
-                    if abs(r - prev_r) > 1 or abs(c - prev_c) > 1:
-                        # Window wrapped around board
-                        break
-                    elif not (0 <= end < len(board)):
-                        # Window extends off of board
-                        break
-
-                    # Add count for new item in window
-                    new_piece = board[end]
-                    if new_piece == player:
-                        num_player += 1
-                    elif new_piece == GameState.EMPTY:
-                        empty_index = end
-                    else:
-                        num_other += 1
-        return len(player_counted), len(other_counted)
-
-    def __init__(self, player: int, board: Any, board_values: Dict[Any, float],
-                 last_move: int, kwargs: Dict[str, Any] = None):
-        super().__init__(player, board, board_values, last_move, kwargs=kwargs)
-        if last_move == -1:
-            return
+        counts = self.threat_counts[piece]
+        if counts[index] == 0:
+            self.num_threats[piece] += 1
+        counts[index] += change
+        if counts[index] == 0:
+            self.num_threats[piece] -= 1
+
+    def _update_windows(self, index: int, change: int):
+        """Update window and threat counts for player's piece at index being
+        placed (change = 1) or removed (change = -1). The piece must be on the board.
+        """
+        player = self.player
+        own_counts, other_counts = self.window_counts[player], self.window_counts[-player]
+        for number in self.config.cell_windows[index]:
+            # Pieces in the window without the piece at index
+            own = own_counts[number] - (change < 0)
+            other = other_counts[number]
+            if other == 0 and own == 3:
+                # The piece completes the four that index was a threat for
+                self._add_threat(player, index, -change)
+            elif other == 0 and own == 2:
+                # The piece makes a three, threatening the window's other empty space
+                window = self.config.windows[number]
+                empty = next(i for i in window if i != index and self.board[i] == GameState.EMPTY)
+                self._add_threat(player, empty, change)
+            elif own == 0 and other == 3:
+                # The piece blocks the other player's threat at index
+                self._add_threat(-player, index, -change)
+            own_counts[number] += change
+
+    def place(self, index: int):
+        """Put player's piece on the board at index.
+        """
+        self.board[index] = self.player
+        self._update_windows(index, 1)
 
-         # Check if last move ended the game
+    def remove(self, index: int):
+        """Take player's piece at index off the board.
+        """
+        self._update_windows(index, -1)
+        self.board[index] = GameState.EMPTY
+
+    def check_end(self):
+        """Set win, tie and ended for player's last move.
+        """
+        # Check if last move ended the game
         self.win = self.check_win()
-        self.tie = not self.win and all(space != GameState.EMPTY for space in self.board[:7])
+        self.tie = not self.win and GameState.EMPTY not in self.board[:7]
         self.ended = self.win or self.tie
 
     def gen_indices(self) -> Generator[int, None, None]:
         """Generator of valid moves for AI.
         """
         # Try each column
-        for index in random.sample(range(7), 7):
+        for index in range(7):
             if self.board[index] != GameState.EMPTY:
                 # Column is full
                 continue
@@ -178,11 +130,22 @@ class C4GameState(GameState):
                 pass
             yield index
 
+    @classmethod
+    def symmetry_maps(cls, config: GameConfig) -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[Tuple[int, ...], ...]]:
+        """Index maps for mirroring the board left to right, and their inverses.
+        """
+        return board_symmetries(6, 7, True)
+
+    def move_priority(self, index: int) -> float:
+        """Prefer central columns, which are part of more possible fours.
+        """
+        return -abs(index % 7 - 3)
+
     def heuristic(self) -> float:
         """Approximate value of non-terminal state.
         """
         # Count number of ways each player could win from here
-        player_threes, other_threes = self.count_threes()
+        player_threes, other_threes = self.num_threats[self.player], self.num_threats[-self.player]
 
         # Convert difference in ways to number between -1 and 1
         # There are less than 50 spaces that could win the game
@@ -194,6 +157,208 @@ class C4GameState(GameState):
             return -h
 
 
+class C4BitboardGameState(GameState):
+    """
+    Bitboard representation of a specific board state.
+    player: the player that played last_move
+    player_bits, ai_bits: one bit per occupied space for each player
+    heights: the bit index of the next empty space in each column
+    last_move: the index of the last move made by player
+
+    Bits are laid out column by column from the bottom up, with one unused
+    sentinel bit on top of each column so that shifted lines never wrap:
+
+         5 12 19 26 33 40 47
+         4 11 18 25 32 39 46
+         ...
+         0  7 14 21 28 35 42
+    """
+
+    ROWS: int = 6
+    COLS: int = 7
+    # Bit shifts that step along each axis (vertical, horizontal, both diagonals)
+    AXIS_SHIFTS: Tuple[int, ...] = (1, 7, 6, 8)
+    # Mask of every playable space and of the bottom space in each column
+    BOARD_MASK: int = sum(((1 << 6) - 1) << (7 * col) for col in range(7))
+    BOTTOM_MASK: int = sum(1 << (7 * col) for col in range(7))
+
+    __slots__ = ('player_bits', 'ai_bits', 'heights', 'num_moves')
+
+    search_algorithm = GameState.PVS
+
+    def __init__(self, player: int, board: Any, table: TranspositionTable,
+                 last_move: int, kwargs: Dict[str, Any] = None, parent_hash: int = None):
+        self.player = player
+        self.table = table
+        self.last_move = last_move
+        self.config = self.get_config(kwargs, self.ROWS * self.COLS)
+        self.history = []
+        self.win, self.tie, self.ended = False, False, False
+
+        # Convert the list board into bitboards
+        self.player_bits, self.ai_bits = 0, 0
+        self.heights = [7 * col for col in range(self.COLS)]
+        self.num_moves = 0
+        for col in range(self.COLS):
+            for row in range(self.ROWS - 1, -1, -1):
+                piece = board[row * self.COLS + col]
+                if piece == GameState.EMPTY:
+                    break
+                self._place(piece, col)
+
+        # Skip first move:
+        if last_move == -1:
+            self.hash = self.zobrist_hash()
+            self.init_symmetry()
+            return
+
+        # Apply move unless the board already contains it
+        if board[last_move] == GameState.EMPTY:
+            self._place(player, last_move % self.COLS)
+        if parent_hash is None:
+            self.hash = self.zobrist_hash()
+        else:
+            self.hash = self.update_hash(parent_hash, last_move)
+        self.init_symmetry()
+        self.check_end()
+
+    def _place(self, piece: int, col: int):
+        """Drop piece into col.
+        """
+        bit = 1 << self.heights[col]
+        if piece == GameState.PLAYER:
+            self.player_bits |= bit
+        else:
+            self.ai_bits |= bit
+        self.heights[col] += 1
+        self.num_moves += 1
+
+    def place(self, index: int):
+        """Drop player's piece into the column of index.
+        """
+        self._place(self.player, index % self.COLS)
+
+    def remove(self, index: int):
+        """Take player's piece off the top of the column of index.
+        """
+        col = index % self.COLS
+        self.heights[col] -= 1
+        bit = 1 << self.heights[col]
+        if self.player == GameState.PLAYER:
+            self.player_bits ^= bit
+        else:
+            self.ai_bits ^= bit
+        self.num_moves -= 1
+
+    def check_end(self):
+        """Set win, tie and ended for player's last move.
+        """
+        bits = self.player_bits if self.player == GameState.PLAYER else self.ai_bits
+        self.win = self.is_four(bits)
+        self.tie = not self.win and self.num_moves == self.ROWS * self.COLS
+        self.ended = self.win or self.tie
+
+    @classmethod
+    def is_four(cls, bits: int) -> bool:
+        """Check if bits contains four in a row along any axis.
+        """
+        for shift in cls.AXIS_SHIFTS:
+            pairs = bits & (bits >> shift)
+            if pairs & (pairs >> (2 * shift)):
+                return True
+        return False
+
+    @classmethod
+    def winning_spaces(cls, bits: int, empty: int) -> int:
+        """Bitboard of the empty spaces that would complete a four for bits.
+        """
+        spaces = 0
+        for shift in cls.AXIS_SHIFTS:
+            # Three in a row ending next to the space, in either direction
+            pairs = (bits << shift) & (bits << (2 * shift))
+            spaces |= pairs & (bits << (3 * shift))
+            spaces |= pairs & (bits >> shift)
+            pairs = (bits >> shift) & (bits >> (2 * shift))
+            spaces |= pairs & (bits << shift)
+            spaces |= pairs & (bits >> (3 * shift))
+        return spaces & empty
+
+    @property
+    def board(self) -> List[int]:
+        """List board equivalent to the bitboards, for display and debugging.
+        """
+        board = [GameState.EMPTY] * (self.ROWS * self.COLS)
+        for index in range(len(board)):
+            row, col = divmod(index, self.COLS)
+            bit = 1 << (col * 7 + self.ROWS - 1 - row)
+            if self.player_bits & bit:
+                board[index] = GameState.PLAYER
+            elif self.ai_bits & bit:
+                board[index] = GameState.AI
+        return board
+
+    def next_state(self, index: int) -> 'C4BitboardGameState':
+        """Create the state reached when the other player plays index.
+        Copies two ints and the column heights instead of the full board.
+        """
+        state = object.__new__(type(self))
+        state.player = self.player
+        state.table = self.table
+        state.last_move = self.last_move
+        state.config = self.config
+        state.history = []
+        state.win, state.tie, state.ended = False, False, False
+        state.player_bits = self.player_bits
+        state.ai_bits = self.ai_bits
+        state.heights = self.heights.copy()
+        state.num_moves = self.num_moves
+        state.hash = self.hash
+        state.sym_hashes = self.sym_hashes[:]
+        state.apply_move(index)
+        return state
+
+    def gen_indices(self) -> Generator[int, None, None]:
+        """Generator of valid moves for AI.
+        """
+        # Try each column
+        for col in range(self.COLS):
+            height = self.heights[col] - 7 * col
+            if height == self.ROWS:
+                # Column is full
+                continue
+            yield (self.ROWS - 1 - height) * self.COLS + col
+
+    @classmethod
+    def symmetry_maps(cls, config: GameConfig) -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[Tuple[int, ...], ...]]:
+        """Index maps for mirroring the board left to right, and their inverses.
+        """
+        return board_symmetries(6, 7, True)
+
+    def move_priority(self, index: int) -> float:
+        """Prefer central columns, which are part of more possible fours.
+        """
+        return -abs(index % self.COLS - self.COLS // 2)
+
+    def heuristic(self) -> float:
+        """Approximate value of non-terminal state.
+        """
+        # Count number of ways each player could win from here
+        empty = self.BOARD_MASK & ~(self.player_bits | self.ai_bits)
+        if self.player == GameState.PLAYER:
+            bits, other_bits = self.player_bits, self.ai_bits
+        else:
+            bits, other_bits = self.ai_bits, self.player_bits
+        player_threes = bin(self.winning_spaces(bits, empty)).count('1')
+        other_threes = bin(self.winning_spaces(other_bits, empty)).count('1')
+
+        # Same scale as C4GameState.heuristic
+        h = (player_threes - other_threes) / 50
+        if self.player == self.AI:
+            return h
+        else:
+            return -h
+
+
 class C4Game(Game):
     # Player markers
     FIRST = 'X'
@@ -201,12 +366,54 @@ class C4Game(Game):
 
     gamestate_cls = C4GameState
 
-    def __init__(self, player_first: bool, max_depth: int = 5, **kwargs):
+    def __init__(self, player_first: bool, max_depth: int = 5, bitboard: bool = False,
+                 solve: bool = False, weak: bool = False, **kwargs):
         # The normal Connect 4 has 6 rows and 7 columns
         self.board = [GameState.EMPTY] * (6 * 7)
+        if bitboard:
+            self.gamestate_cls = C4BitboardGameState
         self.gamestate_cls.max_depth = max_depth
 
-        super().__init__(player_first)
+        # In solver mode, play perfectly when the position can be solved in time
+        # The solver keeps its table between moves, since its entries are exact
+        self.solver = None
+        self.weak = weak
+        if solve:
+            # Imported here to avoid a circular import
+            from games.c4solver import C4Solver
+            self.solver = C4Solver(TranspositionTable(kwargs.get('table_size'), kwargs.get('table_bytes')))
+
+        super().__init__(player_first, **kwargs)
+
+    def book_name(self) -> str:
+        """Name of the opening book file for this game and its options.
+        """
+        return 'c4'
+
+    def find_move(self, state: GameState, stats: SearchStats = None) -> int:
+        """Solve the position in solver mode, or search for the AI's best move if
+        it cannot be solved in the time limit.
+        The solver comes before the opening book, whose moves are only as good
+        as the depth-limited searches that built it, so the book is only used
+        for positions that cannot be solved in time.
+        """
+        if self.solver is None:
+            return super().find_move(state, stats)
+
+        solver = self.solver
+        time_limit = self.time_limit if self.time_limit is not None else solver.DEFAULT_TIME_LIMIT
+        current, mask, moves = solver.from_board(state.board, GameState.AI)
+        start, start_nodes = time.perf_counter(), solver.nodes
+        try:
+            move, score = solver.best_move(current, mask, moves, self.weak, time_limit)
+            print(f'Solved: {solver.describe(score, moves, self.weak)} for me')
+        except SearchTimeout:
+            print(f'Could not solve the position in {time_limit:g}s, searching instead')
+            move = -1
+        if stats is not None:
+            stats.nodes += solver.nodes - start_nodes
+            stats.seconds += time.perf_counter() - start
+        return move if move != -1 else super().find_move(state, stats)
 
     def move_is_valid(self, move: int) -> bool:
         """Check that move choice is valid.
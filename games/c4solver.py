@@ -0,0 +1,236 @@
+import time
+from typing import List, Tuple
+
+from games import GameState, SearchTimeout
+from games.c4 import C4BitboardGameState
+from games.table import TranspositionTable
+
+
+class C4Solver():
+    """
+    Exact solver for 6x7 Connect 4 positions.
+    Positions are two bitboards in the layout of C4BitboardGameState:
+        current: the pieces of the player to move
+        mask: every occupied space
+    A position's score is from the point of view of the player to move:
+        positive: they win, and the score is 22 minus the number of pieces
+                  they will have played when they do (faster wins score higher)
+        negative: the other player wins, scored the same way for them
+        zero: the game is a tie with best play
+    The search is a negamax over scores that only explores moves that do not
+    lose immediately, tries moves that create the most threats first, and finds
+    the score by a binary search of null-window searches. Bounds on scores are
+    kept in a TranspositionTable keyed by current + mask, which is unique per position.
+    A weak solve only finds whether the position is won, lost or tied.
+    """
+
+    ROWS: int = C4BitboardGameState.ROWS
+    COLS: int = C4BitboardGameState.COLS
+    SPACES: int = ROWS * COLS
+    BOARD_MASK: int = C4BitboardGameState.BOARD_MASK
+    BOTTOM_MASK: int = C4BitboardGameState.BOTTOM_MASK
+    # Columns from the center out, since central moves are usually better
+    COLUMN_ORDER: Tuple[int, ...] = (3, 2, 4, 1, 5, 0, 6)
+    # Nodes between checks of the time limit
+    CHECK_INTERVAL: int = 1023
+    # Seconds the solver may spend on a move when no time limit is given
+    DEFAULT_TIME_LIMIT: float = 10.0
+
+    def __init__(self, table: TranspositionTable = None):
+        self.table = table or TranspositionTable()
+        self.nodes = 0
+        self.deadline = None
+
+    @classmethod
+    def from_board(cls, board: List[int], player: int) -> Tuple[int, int, int]:
+        """Bitboards (current, mask, number of moves) of a list board where player is to move.
+        """
+        current, mask, moves = 0, 0, 0
+        for index, piece in enumerate(board):
+            if piece == GameState.EMPTY:
+                continue
+            row, col = divmod(index, cls.COLS)
+            bit = 1 << (col * (cls.ROWS + 1) + cls.ROWS - 1 - row)
+            mask |= bit
+            moves += 1
+            if piece == player:
+                current |= bit
+        return current, mask, moves
+
+    @classmethod
+    def move_index(cls, mask: int, move: int) -> int:
+        """Board index of the space of the move bit.
+        """
+        position = move.bit_length() - 1
+        col, height = divmod(position, cls.ROWS + 1)
+        return (cls.ROWS - 1 - height) * cls.COLS + col
+
+    @staticmethod
+    def table_key(current: int, mask: int) -> int:
+        """Table key of a position: current + mask, which is unique per position,
+        mixed so that positions spread over the table's slots, which are picked
+        by the key's low bits.
+        """
+        key = ((current + mask) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        return key ^ (key >> 32)
+
+    @classmethod
+    def non_losing_moves(cls, current: int, mask: int) -> int:
+        """Bitboard of the moves after which the other player cannot win immediately.
+        """
+        empty = cls.BOARD_MASK & ~mask
+        possible = (mask + cls.BOTTOM_MASK) & cls.BOARD_MASK
+        threats = C4BitboardGameState.winning_spaces(current ^ mask, empty)
+        forced = possible & threats
+        if forced:
+            if forced & (forced - 1):
+                # The other player has two immediate wins, which cannot both be blocked
+                return 0
+            possible = forced
+        # Playing directly below a threat lets the other player play it
+        return possible & ~(threats >> 1)
+
+    def _negamax(self, current: int, mask: int, moves: int, alpha: int, beta: int) -> int:
+        """Score of a position where the player to move cannot win immediately,
+        or a bound on it if it is outside (alpha, beta).
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & self.CHECK_INTERVAL and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+
+        next_moves = self.non_losing_moves(current, mask)
+        if not next_moves:
+            # Every move lets the other player win with their next piece
+            return -((self.SPACES - moves) // 2)
+        if moves >= self.SPACES - 2:
+            # Neither player can win with the last two pieces
+            return 0
+
+        # The other player cannot win with their next piece, nor can this player
+        lowest = -((self.SPACES - 2 - moves) // 2)
+        if alpha < lowest:
+            alpha = lowest
+            if alpha >= beta:
+                return alpha
+        highest = (self.SPACES - 1 - moves) // 2
+        key = self.table_key(current, mask)
+        entry = self.table.lookup(key)
+        if entry is not None:
+            value, flag = int(entry[0]), entry[1]
+            if flag == TranspositionTable.UPPER:
+                highest = min(highest, value)
+            elif flag == TranspositionTable.LOWER and alpha < value:
+                alpha = value
+                if alpha >= beta:
+                    return alpha
+        if beta > highest:
+            beta = highest
+            if alpha >= beta:
+                return beta
+
+        # Try moves that leave the most threats first
+        ordered = []
+        empty = self.BOARD_MASK & ~mask
+        for col in self.COLUMN_ORDER:
+            move = next_moves & (((1 << self.ROWS) - 1) << (col * (self.ROWS + 1)))
+            if move:
+                threats = C4BitboardGameState.winning_spaces(current | move, empty & ~move)
+                ordered.append((-bin(threats).count('1'), len(ordered), move))
+        ordered.sort()
+
+        for _, _, move in ordered:
+            score = -self._negamax(current ^ mask, mask | move, moves + 1, -beta, -alpha)
+            if score >= beta:
+                self.table.store(key, score, TranspositionTable.LOWER, 0, -1)
+                return score
+            if score > alpha:
+                alpha = score
+        self.table.store(key, alpha, TranspositionTable.UPPER, 0, -1)
+        return alpha
+
+    def solve(self, current: int, mask: int, moves: int, weak: bool = False) -> int:
+        """Score of the position for the player to move.
+        With weak, only the sign of the score is exact.
+        """
+        empty = self.BOARD_MASK & ~mask
+        possible = (mask + self.BOTTOM_MASK) & self.BOARD_MASK
+        if C4BitboardGameState.winning_spaces(current, empty) & possible:
+            return (self.SPACES + 1 - moves) // 2
+        if moves == self.SPACES:
+            return 0
+
+        low, high = -((self.SPACES - moves) // 2), (self.SPACES + 1 - moves) // 2
+        if weak:
+            low, high = -1, 1
+        # Narrow the bounds with null-window searches, trying values near zero first
+        while low < high:
+            mid = low + (high - low) // 2
+            if mid <= 0 and int(low / 2) < mid:
+                mid = int(low / 2)
+            elif mid >= 0 and int(high / 2) > mid:
+                mid = int(high / 2)
+            score = self._negamax(current, mask, moves, mid, mid + 1)
+            if score <= mid:
+                high = score
+            else:
+                low = score
+        return low
+
+    def best_move(self, current: int, mask: int, moves: int, weak: bool = False,
+                  time_limit: float = None) -> Tuple[int, int]:
+        """Best move for the player to move and the position's score.
+        With weak, any move that keeps the best result (win, tie or loss) may be chosen.
+        Raises SearchTimeout if time_limit (in seconds) runs out.
+        Returns (board index of the move, score).
+        """
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        try:
+            empty = self.BOARD_MASK & ~mask
+            possible = (mask + self.BOTTOM_MASK) & self.BOARD_MASK
+            wins = C4BitboardGameState.winning_spaces(current, empty) & possible
+            if wins:
+                return self.move_index(mask, wins & -wins), (self.SPACES + 1 - moves) // 2
+
+            score = self.solve(current, mask, moves, weak)
+            candidates = self.non_losing_moves(current, mask)
+            if not candidates:
+                # Every move loses, so play any legal move
+                return self.move_index(mask, possible & -possible), score
+
+            # Find a move that keeps the score, by a null-window search of each move
+            best_index = -1
+            for col in self.COLUMN_ORDER:
+                move = candidates & (((1 << self.ROWS) - 1) << (col * (self.ROWS + 1)))
+                if not move:
+                    continue
+                if best_index == -1:
+                    best_index = self.move_index(mask, move)
+                if weak:
+                    # Only the result is known, so find a move that is no worse
+                    bound = 1 if score > 0 else (0 if score == 0 else -self.SPACES)
+                else:
+                    bound = score
+                if -self._negamax(current ^ mask, mask | move, moves + 1, -bound, -bound + 1) >= bound:
+                    return self.move_index(mask, move), score
+            return best_index, score
+        finally:
+            self.deadline = None
+
+    @classmethod
+    def describe(cls, score: int, moves: int, weak: bool = False) -> str:
+        """Result of a position's score for the player to move, in words.
+        moves is the number of pieces on the board, and weak whether the score
+        came from a weak solve, which only gives the result.
+        """
+        if score == 0:
+            return 'tie with best play'
+        if weak:
+            return 'win' if score > 0 else 'loss'
+        # Pieces the winner will have played when they win, and pieces they have now
+        if score > 0:
+            winner_pieces = (cls.SPACES + 2) // 2 - score
+            turns = winner_pieces - moves // 2
+            return f'win in {turns} move{"s" if turns != 1 else ""}'
+        winner_pieces = (cls.SPACES + 2) // 2 + score
+        turns = winner_pieces - (moves + 1) // 2
+        return f'loss in {turns} move{"s" if turns != 1 else ""}'
@@ -0,0 +1,28 @@
+from typing import Any, Dict, List, Tuple
+
+from games import GameState
+from games.c4 import C4BitboardGameState, C4GameState
+from games.mnk import MNKGameState, MNKGravityGameState
+from games.ttt import TTTGameState
+
+# Engines that can be benchmarked, played in batch mode and served, with the options
+# their states need, their number of spaces and the name of their opening book,
+# which is the name the game's book_name gives it
+ENGINES: Dict[str, Tuple[type, Dict[str, Any], int, str]] = {
+    'ttt3': (TTTGameState, {'board_size': 3}, 9, 'ttt3'),
+    'ttt4': (TTTGameState, {'board_size': 4}, 16, 'ttt4'),
+    'ttt5k4': (TTTGameState, {'board_size': 5, 'win_length': 4}, 25, 'ttt5k4'),
+    'c4': (C4GameState, {}, 42, 'c4'),
+    'c4-bitboard': (C4BitboardGameState, {}, 42, 'c4'),
+    'connect7x8': (MNKGravityGameState, {'rows': 7, 'cols': 8, 'win_length': 4}, 56, 'mnk7x8k4g'),
+    'gomoku15': (MNKGameState, {'rows': 15, 'cols': 15, 'win_length': 5}, 225, 'mnk15x15k5'),
+}
+
+# Characters used in the position drawings
+PIECES: Dict[str, int] = {'.': GameState.EMPTY, 'x': GameState.PLAYER, 'o': GameState.AI}
+
+
+def parse_board(drawing: str) -> List[int]:
+    """Board list for a position drawing.
+    """
+    return [PIECES[char] for line in drawing.split() for char in line]
@@ -0,0 +1,65 @@
+from functools import lru_cache
+from typing import Tuple
+
+# Row and column steps along each axis: horizontal, vertical and both diagonals
+AXES: Tuple[Tuple[int, int], ...] = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+@lru_cache(maxsize=None)
+def line_tables(rows: int, cols: int, length: int) -> Tuple[Tuple[Tuple[int, ...], ...],
+                                                            Tuple[Tuple[int, ...], ...]]:
+    """Precompute every line of length spaces in a row on a rows x cols board.
+    Returns (lines, cell_lines): the board indices in each line, and for each
+    board index the numbers of the lines that contain it.
+    """
+    lines = []
+    for row in range(rows):
+        for col in range(cols):
+            for row_step, col_step in AXES:
+                # Only keep lines that end on the board
+                end_row, end_col = row + row_step * (length - 1), col + col_step * (length - 1)
+                if 0 <= end_row < rows and 0 <= end_col < cols:
+                    lines.append(tuple((row + row_step * i) * cols + col + col_step * i
+                                       for i in range(length)))
+
+    cell_lines = [[] for _ in range(rows * cols)]
+    for number, line in enumerate(lines):
+        for index in line:
+            cell_lines[index].append(number)
+    return tuple(lines), tuple(tuple(numbers) for numbers in cell_lines)
+
+
+@lru_cache(maxsize=None)
+def board_symmetries(rows: int, cols: int, gravity: bool) -> Tuple[Tuple[Tuple[int, ...], ...],
+                                                                   Tuple[Tuple[int, ...], ...]]:
+    """Precompute the symmetries of a rows x cols board, other than the identity.
+    With gravity, only the left-right mirror keeps positions legal. Otherwise
+    square boards have 7 (rotations and reflections) and others have 3.
+    Returns (maps, inverses): for each symmetry, the index each board index is
+    moved to, and the map that moves it back.
+    """
+    last_row, last_col = rows - 1, cols - 1
+    transforms = [lambda r, c: (r, last_col - c)]
+    if not gravity:
+        transforms += [
+            lambda r, c: (last_row - r, c),
+            lambda r, c: (last_row - r, last_col - c)
+        ]
+        if rows == cols:
+            transforms += [
+                lambda r, c: (c, last_row - r),
+                lambda r, c: (last_col - c, r),
+                lambda r, c: (c, r),
+                lambda r, c: (last_col - c, last_row - r)
+            ]
+
+    maps, inverses = [], []
+    for transform in transforms:
+        forward, backward = [0] * (rows * cols), [0] * (rows * cols)
+        for index in range(rows * cols):
+            row, col = transform(*divmod(index, cols))
+            forward[index] = row * cols + col
+            backward[row * cols + col] = index
+        maps.append(tuple(forward))
+        inverses.append(tuple(backward))
+    return tuple(maps), tuple(inverses)
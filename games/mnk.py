@@ -0,0 +1,286 @@
+from array import array
+from typing import Generator, List, Optional, Tuple
+
+from games import Game, GameConfig, GameState
+from games.lines import board_symmetries, line_tables
+
+
+class MNKGameState(GameState):
+    """
+    Representation of a specific board state of an m,n,k-game: a rows x cols
+    board where the first player with win_length pieces in a row wins.
+    player: the player that played last_move
+    board: the current board state
+    rows, cols: the board's dimensions, from kwargs
+    win_length: the number of pieces in a row that wins, from kwargs
+    last_move: the index of the last move made by player
+    line_counts: number of pieces each player has in each winning line
+    num_empty: number of empty spaces left on the board
+    The winning lines are precomputed once per board configuration.
+    """
+
+    __slots__ = ('line_counts', 'num_empty')
+
+    max_depth = None
+    search_algorithm = GameState.PVS
+
+    # Scale of the heuristic: a score of this many points is worth half a win
+    HEURISTIC_SCALE: float = 20
+    # Boards with fewer winning lines score leaves one at a time, since a batch
+    # costs as much as scoring several of their leaves
+    MIN_BATCH_LINES: int = 100
+
+    @classmethod
+    def init_config(cls, config: GameConfig):
+        """Read the board's dimensions from kwargs and precompute its tables.
+        """
+        config.rows, config.cols = config.kwargs['rows'], config.kwargs['cols']
+        config.win_length = config.kwargs['win_length']
+        cls.init_lines(config)
+
+    @classmethod
+    def init_lines(cls, config: GameConfig):
+        """Precompute the winning lines of the board and the heuristic's weights,
+        shared by all states.
+        """
+        config.lines, config.cell_lines = line_tables(config.rows, config.cols, config.win_length)
+        # Points for a line holding only one player's pieces, by number of pieces
+        # Each extra piece makes the line worth several times as much
+        config.line_weights = tuple(0 if count == 0 else 4 ** (count - 1) for count in range(config.win_length + 1))
+        # Scores all moves from a state at once, built when batch_leaves is first used
+        config.line_evaluator = None
+
+    def init_board(self):
+        """Count pieces per winning line so end-of-game checks only look at
+        the lines through the last move.
+        """
+        lines = self.config.lines
+        self.line_counts = {
+            GameState.PLAYER: array('B', [0]) * len(lines),
+            GameState.AI: array('B', [0]) * len(lines)
+        }
+        for number, line in enumerate(lines):
+            for index in line:
+                piece = self.board[index]
+                if piece != GameState.EMPTY:
+                    self.line_counts[piece][number] += 1
+        self.num_empty = self.board.count(GameState.EMPTY)
+
+    def place(self, index: int):
+        """Put player's piece on the board at index.
+        """
+        self.board[index] = self.player
+        counts = self.line_counts[self.player]
+        for number in self.config.cell_lines[index]:
+            counts[number] += 1
+        self.num_empty -= 1
+
+    def remove(self, index: int):
+        """Take player's piece at index off the board.
+        """
+        self.board[index] = GameState.EMPTY
+        counts = self.line_counts[self.player]
+        for number in self.config.cell_lines[index]:
+            counts[number] -= 1
+        self.num_empty += 1
+
+    def check_end(self):
+        """Set win, tie and ended for player's last move.
+        """
+        # Check if last move completed any of the lines through it
+        config = self.config
+        counts = self.line_counts[self.player]
+        self.win = any(counts[number] == config.win_length for number in config.cell_lines[self.last_move])
+        self.tie = not self.win and self.num_empty == 0
+        self.ended = self.win or self.tie
+
+    def gen_indices(self) -> Generator[int, None, None]:
+        """Generator of valid move indices for AI.
+        """
+        for index in range(len(self.board)):
+            if self.board[index] == GameState.EMPTY:
+                yield index
+
+    @classmethod
+    def symmetry_maps(cls, config: GameConfig) -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[Tuple[int, ...], ...]]:
+        """Index maps for the rotations and reflections of the board, and their inverses.
+        """
+        return board_symmetries(config.kwargs['rows'], config.kwargs['cols'], False)
+
+    def move_priority(self, index: int) -> float:
+        """Prefer spaces that are part of more winning lines (center and corners).
+        """
+        return len(self.config.cell_lines[index])
+
+    def heuristic(self) -> float:
+        """Approximate value of non-terminal state.
+        """
+        # Score the lines that only one player can still complete
+        weights = self.config.line_weights
+        score = 0
+        for ai, player in zip(self.line_counts[GameState.AI], self.line_counts[GameState.PLAYER]):
+            if not player:
+                score += weights[ai]
+            elif not ai:
+                score -= weights[player]
+
+        # Convert score to a number between -1 and 1 that keeps its order
+        return score / (abs(score) + self.HEURISTIC_SCALE)
+
+    def evaluate_leaves(self, moves: List[int]) -> Optional[List[float]]:
+        """Score the states reached by each of moves together with NumPy,
+        giving the same values as heuristic. Returns None without NumPy, or on
+        boards too small for NumPy's overhead to pay off.
+        """
+        config = self.config
+        if len(config.lines) < self.MIN_BATCH_LINES:
+            return None
+        if config.line_evaluator is None:
+            # Imported here so NumPy is only loaded when batches are used
+            from games.vectorized import LineEvaluator, available
+            if not available():
+                return None
+            config.line_evaluator = LineEvaluator(config.lines, len(self.board), config.line_weights,
+                                                  self.HEURISTIC_SCALE)
+        return config.line_evaluator.evaluate(self.line_counts[GameState.AI], self.line_counts[GameState.PLAYER],
+                                              self.player == GameState.PLAYER)
+
+
+class MNKGravityGameState(MNKGameState):
+    """
+    Board state of an m,n,k-game with gravity, such as Connect 4: pieces are
+    dropped into a column and land on the lowest empty space in it.
+    heights: the number of pieces in each column
+    The spaces of each column, from the bottom up, are precomputed once per
+    board configuration, so moves are generated without scanning the board.
+    """
+
+    __slots__ = ('heights',)
+
+    @classmethod
+    def init_config(cls, config: GameConfig):
+        """Precompute the winning lines and the spaces of each column, bottom first.
+        """
+        super().init_config(config)
+        rows, cols = config.rows, config.cols
+        config.columns = tuple(tuple((rows - 1 - height) * cols + col for height in range(rows))
+                               for col in range(cols))
+
+    def init_board(self):
+        """Count pieces per winning line and per column.
+        """
+        super().init_board()
+        self.heights = array('B', [0]) * self.config.cols
+        for col, column in enumerate(self.config.columns):
+            self.heights[col] = sum(self.board[index] != GameState.EMPTY for index in column)
+
+    def place(self, index: int):
+        """Put player's piece on the board at index, the lowest empty space of its column.
+        """
+        super().place(index)
+        self.heights[index % self.config.cols] += 1
+
+    def remove(self, index: int):
+        """Take player's piece at index, the top of its column, off the board.
+        """
+        super().remove(index)
+        self.heights[index % self.config.cols] -= 1
+
+    def gen_indices(self) -> Generator[int, None, None]:
+        """Generator of valid moves for AI: the lowest empty space of each column that is not full.
+        """
+        rows = self.config.rows
+        for column, height in zip(self.config.columns, self.heights):
+            if height < rows:
+                yield column[height]
+
+    @classmethod
+    def symmetry_maps(cls, config: GameConfig) -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[Tuple[int, ...], ...]]:
+        """Index maps for mirroring the board left to right, and their inverses.
+        """
+        return board_symmetries(config.kwargs['rows'], config.kwargs['cols'], True)
+
+
+class MNKGame(Game):
+    # Player markers
+    FIRST = 'X'
+    SECOND = 'O'
+
+    gamestate_cls = MNKGameState
+
+    def __init__(self, player_first: bool, rows: int = 3, cols: int = 3, win_length: int = None,
+                 gravity: bool = False, max_depth: int = 5, **kwargs):
+        self.board = [GameState.EMPTY] * (rows * cols)
+        self.rows, self.cols = rows, cols
+        # By default a player needs a full row (or column, on tall boards) to win
+        self.win_length = win_length or min(rows, cols)
+        if not 1 <= self.win_length <= max(rows, cols):
+            raise ValueError(f'Win length must be between 1 and {max(rows, cols)}')
+        self.gravity = gravity
+        if gravity:
+            self.gamestate_cls = MNKGravityGameState
+        self.gamestate_cls.max_depth = max_depth
+
+        self.kwargs = {'rows': rows, 'cols': cols, 'win_length': self.win_length}
+        super().__init__(player_first, **kwargs)
+
+    def book_name(self) -> str:
+        """Name of the opening book file for this game and its options.
+        """
+        return f'mnk{self.rows}x{self.cols}k{self.win_length}{"g" if self.gravity else ""}'
+
+    def move_is_valid(self, move: int) -> bool:
+        """Check that move choice is valid: a column that is not full with
+        gravity, or any space without it.
+        """
+        if self.gravity:
+            return 1 <= move <= self.cols and self.board[move - 1] == GameState.EMPTY
+        return 1 <= move <= self.rows * self.cols
+
+    def move_to_index(self, move: int) -> int:
+        """Convert move choice to index in self.board
+        """
+        index = move - 1
+        if self.gravity:
+            # Drop move down until no empty space
+            while index + self.cols < len(self.board) and self.board[index + self.cols] == GameState.EMPTY:
+                index += self.cols
+        return index
+
+    def print_board(self, print_indices=True):
+        """ Print the game board. For a 3x4 game with gravity the output should be:
+
+           |   |   |
+           | O |   |
+         X | X | O |
+        ---------------
+         1   2   3   4
+
+        Without gravity, the number of each space is printed beside the board,
+        as for Tic-Tac-Toe.
+        """
+        cols = self.cols
+
+        # Get the text that will be in each space
+        tokens = [self.markers[space] for space in self.board]
+        token_lines = [' ' + ' | '.join(tokens[i:i+cols]) for i in range(0, len(self.board), cols)]
+        horiz_line = '-' * (4 * cols - 1)
+
+        print()
+        if self.gravity:
+            for line in token_lines:
+                print(line)
+            print(horiz_line)
+            if print_indices:
+                print(''.join(str(col + 1).center(4) for col in range(cols)))
+        else:
+            # Pad every space number to the width of the largest
+            width = len(str(len(self.board)))
+            index_lines = [' | '.join(str(index + 1).rjust(width) for index in range(i, i + cols))
+                           for i in range(0, len(self.board), cols)]
+            index_horiz_line = '-' * ((width + 3) * cols - 3)
+            for i, line in enumerate(token_lines):
+                if i > 0:
+                    print(' ' + horiz_line[2:] + ('    ' + index_horiz_line if print_indices else ''))
+                print(line + ('    ' + index_lines[i] if print_indices else ''))
+        print()
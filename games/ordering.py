@@ -0,0 +1,65 @@
+import random
+from typing import Any, Dict, List
+
+
+class MoveOrderer():
+    """
+    Orders the moves searched in a state so alpha-beta prunes as early as possible.
+    Moves are tried in this order:
+        1. the best move stored for the state in the transposition table
+        2. killer moves: moves that caused a cutoff at the same ply
+        3. the rest, by history score (cutoffs caused anywhere in the tree)
+           and then by the game's static preference (state.move_priority)
+        rand: random.Random used to break ties between equal moves, or None
+              to keep ties in gen_indices order
+    """
+
+    # Number of killer moves remembered per ply
+    NUM_KILLERS: int = 2
+    # Cap on the remaining depth used to weight history scores
+    MAX_HISTORY_DEPTH: int = 32
+
+    def __init__(self, rand: random.Random = None):
+        self.rand = rand
+        self.killers: List[List[int]] = []
+        self.history: Dict[int, Dict[int, int]] = {}
+
+    def new_search(self):
+        """Forget killer moves and age history scores before a new search.
+        """
+        self.killers = []
+        for scores in self.history.values():
+            for index in scores:
+                scores[index] //= 2
+
+    def order(self, state: Any, ply: int, hash_move: int = -1) -> List[int]:
+        """List of valid moves in state, best candidates first.
+        """
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        scores = self.history.get(-state.player, {})
+        rand = self.rand
+
+        def key(index):
+            if index == hash_move:
+                return (3, 0, 0, 0)
+            elif index in killers:
+                # Earlier killers caused their cutoff more recently
+                return (2 - killers.index(index) / len(killers), 0, 0, 0)
+            return (0, scores.get(index, 0), state.move_priority(index), rand.random() if rand else 0)
+
+        return sorted(state.gen_indices(), key=key, reverse=True)
+
+    def record_cutoff(self, state: Any, index: int, ply: int, remaining: int):
+        """Remember that the player to move in state caused a cutoff by playing index.
+        """
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if index not in killers:
+            killers.insert(0, index)
+            del killers[self.NUM_KILLERS:]
+
+        # Cutoffs found with more depth remaining are more valuable
+        scores = self.history.setdefault(-state.player, {})
+        weight = min(remaining, self.MAX_HISTORY_DEPTH)
+        scores[index] = scores.get(index, 0) + weight * weight
@@ -0,0 +1,100 @@
+import math
+import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from games import GameState
+from games.ordering import MoveOrderer
+from games.stats import SearchStats
+from games.table import TranspositionTable
+
+
+def search_root_move(gamestate_cls: type, player: int, board: List[int], kwargs: Dict[str, Any],
+                     max_depth: int, index: int, time_limit: float, seed: int,
+                     alpha: float = -2, beta: float = 2,
+                     collect_stats: bool = False, table_capacity: int = None,
+                     table_policy: str = TranspositionTable.DEPTH, search_algorithm: str = GameState.ALPHABETA,
+                     aspiration_window: float = None, batch_leaves: bool = False) -> Tuple[float, SearchStats]:
+    """Value of the state reached by playing index, searched in a worker process
+    with the window (alpha, beta), and the search's statistics if collect_stats.
+    Each call gets a fresh table so results do not depend on which worker ran it.
+    The table has the same capacity as the table of the search that started it.
+    """
+    # Class-level options are not inherited by spawned worker processes
+    gamestate_cls.max_depth = max_depth
+    gamestate_cls.search_algorithm = search_algorithm
+    gamestate_cls.aspiration_window = aspiration_window
+    gamestate_cls.batch_leaves = batch_leaves
+    table = TranspositionTable(table_capacity, policy=table_policy)
+    state = gamestate_cls(player, board, table, -1, kwargs)
+    state.apply_move(index)
+    rand = random.Random(seed) if seed is not None else None
+    stats = SearchStats() if collect_stats else None
+    value = state.search(time_limit, MoveOrderer(rand), ply=1, alpha=alpha, beta=beta, stats=stats)[1]
+    return value, stats
+
+
+def root_parallel_search(state: GameState, jobs: int, time_limit: float = None,
+                         orderer: MoveOrderer = None, executor: Executor = None,
+                         stats: SearchStats = None) -> Tuple[int, float]:
+    """Search each move from state in a separate process and pick the best.
+    The first move in the orderer's order is searched alone to get a bound, then
+    the rest are searched in parallel with a window that only admits better moves.
+    Ties go to the earlier move, so the result is deterministic for a given seed
+    when time_limit is None.
+    If stats is given, it collects the counters from all workers.
+    Returns (best move, value).
+    """
+    start = time.perf_counter()
+    orderer = orderer or MoveOrderer()
+    orderer.new_search()
+    moves = orderer.order(state, 0)
+
+    # Derive one seed per root move so workers break ties reproducibly
+    rand = orderer.rand
+    seeds = [rand.getrandbits(32) if rand else None for _ in moves]
+
+    # Split the time between the first move and each round of parallel searches
+    if time_limit is not None:
+        time_limit = time_limit / (1 + math.ceil((len(moves) - 1) / jobs))
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(jobs)
+    args = (type(state), state.player, state.board, state.kwargs, state.max_depth)
+    options = {
+        'collect_stats': stats is not None,
+        'table_capacity': state.table.capacity,
+        'table_policy': state.table.policy,
+        'search_algorithm': state.search_algorithm,
+        'aspiration_window': state.aspiration_window,
+        'batch_leaves': state.batch_leaves
+    }
+    try:
+        first_value, first_stats = executor.submit(search_root_move, *args, moves[0], time_limit,
+                                                   seeds[0], **options).result()
+
+        # The AI maximizes the value and the player minimizes it
+        if state.player == GameState.PLAYER:
+            sign, alpha, beta = 1, first_value, 2
+        else:
+            sign, alpha, beta = -1, -2, first_value
+        futures = [executor.submit(search_root_move, *args, index, time_limit, seed, alpha, beta, **options)
+                   for index, seed in zip(moves[1:], seeds[1:])]
+        results = [(first_value, first_stats)] + [future.result() for future in futures]
+    finally:
+        if own_executor:
+            executor.shutdown()
+    values = [value for value, _ in results]
+
+    if stats is not None:
+        # Count the root itself, which was not searched by any worker
+        stats.nodes += 1
+        for _, worker_stats in results:
+            stats.merge(worker_stats)
+        stats.seconds += time.perf_counter() - start
+
+    # Values that failed outside the window are bounds no better than first_value
+    best = max(range(len(moves)), key=lambda i: (sign * values[i], -i))
+    return moves[best], values[best]
@@ -0,0 +1,100 @@
+import threading
+from typing import Any, List
+
+from games import GameState
+from games.ordering import MoveOrderer
+
+
+class Ponderer():
+    """
+    Searches the positions the player's likely moves lead to in a background
+    thread while the player chooses their move, storing the values in the game's
+    table so the AI's search after the player moves finds them there.
+    The player's move is first predicted by a short search of the current
+    position. The position after the predicted move is searched first, then
+    the positions after the rest of the player's moves in the order the search
+    would try them. Each is searched as the AI would search it after that move:
+    with iterative deepening for up to the game's time limit, and no deeper than max_depth.
+    The thread runs while the main thread waits in input(), which releases the GIL.
+    Only one thread uses the table at a time, since stop() waits for the
+    thread to finish before the AI searches.
+    """
+
+    # Seconds spent predicting the player's move
+    PREDICT_TIME: float = 0.1
+    # Seconds to search each position when the game has no time limit
+    DEFAULT_TIME_LIMIT: float = 5.0
+    # Seconds between attempts to stop the search
+    STOP_INTERVAL: float = 0.01
+
+    def __init__(self, time_limit: float = None):
+        self.time_limit = time_limit if time_limit is not None else self.DEFAULT_TIME_LIMIT
+        self.thread = None
+        self.stopping = False
+        # State being searched by the thread
+        self.state = None
+        # Moves predicted for the player and searched since the last start, and nodes visited
+        self.predicted = -1
+        self.pondered: List[int] = []
+        self.nodes = 0
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, game: Any):
+        """Start pondering the position on game's board, where the player is to move.
+        Does nothing if the thread is still pondering it.
+        """
+        if self.running:
+            return
+        self.stop()
+        state = game.gamestate_cls(GameState.AI, game.board, game.table, -1, game.kwargs)
+        self.stopping = False
+        self.predicted, self.pondered, self.nodes = -1, [], 0
+        self.thread = threading.Thread(target=self._run, args=(state,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop pondering and wait for the thread to finish.
+        """
+        if self.thread is None:
+            return
+        self.stopping = True
+        while self.thread.is_alive():
+            # A deadline in the past makes the running search time out at its next check
+            # Set repeatedly, since each iteration of the search sets its own deadline
+            state = self.state
+            if state is not None:
+                state.deadline = float('-inf')
+            self.thread.join(self.STOP_INTERVAL)
+        self.thread = None
+        self.state = None
+
+    def _run(self, state: GameState):
+        """Predict the player's move, then search the position after each of their moves.
+        """
+        orderer = MoveOrderer()
+        self.state = state
+        self.predicted = state.search(self.PREDICT_TIME, orderer)[0]
+        self.nodes += state.nodes
+        for index in orderer.order(state, 0, self.predicted):
+            if self.stopping:
+                break
+            next_state = state.next_state(index)
+            if next_state.ended:
+                continue
+            self.state = next_state
+            next_state.search(self.time_limit, orderer)
+            self.nodes += next_state.nodes
+            if not self.stopping:
+                self.pondered.append(index)
+
+    def report(self, move: int) -> str:
+        """Summary of the pondering done before the player played move.
+        """
+        if move in self.pondered:
+            outcome = 'predicted your move' if move == self.predicted else 'searched your move'
+        else:
+            outcome = 'did not finish searching your move'
+        return f'Pondered {self.nodes} nodes over {len(self.pondered)} of your moves and {outcome}'
@@ -0,0 +1,439 @@
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from games import GameState
+from games.batch import search_move, to_json_line
+from games.engines import ENGINES
+from games.book import BOOK_DIR, OpeningBook
+from games.ordering import MoveOrderer
+from games.stats import SearchStats
+from games.table import TranspositionTable
+
+# Tables and books of the worker process, one per engine, shared by every
+# session whose searches the worker runs
+_tables: Dict[str, TranspositionTable] = {}
+_books: Dict[str, Optional[OpeningBook]] = {}
+_table_size: Optional[int] = None
+
+
+def init_worker(table_size: Optional[int]):
+    """Set the capacity of the worker's tables, which are created on first use.
+    """
+    global _table_size
+    _table_size = table_size
+
+
+def book_for(engine: str) -> Optional[OpeningBook]:
+    """The worker's opening book for engine, or None if none has been built.
+    Books are named after the game and its options, so both Connect 4 engines use c4.book.
+    """
+    if engine not in _books:
+        path = os.path.join(BOOK_DIR, ENGINES[engine][3] + '.book')
+        _books[engine] = OpeningBook(path) if os.path.exists(path) else None
+    return _books[engine]
+
+
+def search_position(engine: str, board: List[int], max_depth: Optional[int],
+                    time_limit: Optional[float]) -> Dict[str, Any]:
+    """Best move for the AI on board, searched in a worker process with the
+    worker's table for engine, which keeps the values found for earlier requests.
+    """
+    gamestate_cls, kwargs, _, _ = ENGINES[engine]
+    table = _tables.get(engine)
+    if table is None:
+        table = _tables[engine] = TranspositionTable(_table_size)
+
+    book = book_for(engine)
+    if book is not None:
+        move = book.lookup(gamestate_cls(GameState.PLAYER, board, table, -1, kwargs))
+        if move != -1:
+            return {'move': move, 'value': None, 'nodes': 0, 'seconds': 0.0, 'book': True}
+
+    stats = SearchStats()
+    move, value = search_move(gamestate_cls, kwargs, board, False, table, MoveOrderer(),
+                              max_depth, time_limit, stats)
+    return {'move': move, 'value': value, 'nodes': stats.nodes, 'seconds': round(stats.seconds, 6), 'book': False}
+
+
+class SearchFailed(Exception):
+    """Raised when a worker's search for the AI's move fails, e.g. because the worker died.
+    """
+
+
+class LatencyMetrics():
+    """
+    Durations of requests, in seconds, summarized as count, mean, percentiles and max.
+    """
+
+    def __init__(self):
+        self.samples: List[float] = []
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        samples = sorted(self.samples)
+        if not samples:
+            return {'count': 0}
+
+        def percentile(fraction):
+            return round(samples[min(int(fraction * len(samples)), len(samples) - 1)], 6)
+
+        return {
+            'count': len(samples),
+            'mean': round(sum(samples) / len(samples), 6),
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'max': round(samples[-1], 6),
+        }
+
+
+class PositionCache():
+    """
+    Best moves found for positions, shared by every session and bounded to
+    capacity entries, least recently used first out.
+    Only searches to a fixed depth are cached, since time-limited searches
+    depend on how fast the worker was.
+    """
+
+    DEFAULT_CAPACITY: int = 1 << 16
+
+    def __init__(self, capacity: int = None):
+        self.capacity = capacity or self.DEFAULT_CAPACITY
+        self.entries: 'OrderedDict[tuple, Dict[str, Any]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: tuple) -> Optional[Dict[str, Any]]:
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def store(self, key: tuple, result: Dict[str, Any]):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+
+class Session():
+    """
+    One game between a client and the AI.
+        board: the board, with the client's pieces as GameState.PLAYER pieces
+        first: whether the client moved first
+        metrics: how long the client waited for each of the AI's moves
+    """
+
+    def __init__(self, number: int, engine: str, first: bool, max_depth: Optional[int],
+                 time_limit: Optional[float]):
+        self.number = number
+        self.engine = engine
+        self.gamestate_cls, self.kwargs, spaces, _ = ENGINES[engine]
+        self.board = [GameState.EMPTY] * spaces
+        self.first = first
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.moves: List[int] = []
+        self.ended = False
+        self.result: Optional[str] = None
+        self.metrics = LatencyMetrics()
+        # Moves of one session are played one at a time
+        self.lock = asyncio.Lock()
+
+    def valid_moves(self) -> List[int]:
+        if self.ended:
+            return []
+        state = self.gamestate_cls(GameState.AI, self.board, None, -1, self.kwargs)
+        return sorted(state.gen_indices())
+
+    def play(self, move: int, marker: int):
+        """Play move for marker and check if it ends the game.
+        """
+        self.board[move] = marker
+        self.moves.append(move)
+        state = self.gamestate_cls(marker, self.board, None, move, self.kwargs)
+        if state.ended:
+            self.ended = True
+            if state.tie:
+                self.result = 'tie'
+            else:
+                self.result = 'player' if marker == GameState.PLAYER else 'ai'
+
+    def take_back(self, move: int):
+        """Undo move, the last move played.
+        """
+        self.board[move] = GameState.EMPTY
+        self.moves.pop()
+        self.ended = False
+        self.result = None
+
+    def view(self) -> Dict[str, Any]:
+        return {
+            'session': self.number,
+            'board': self.board,
+            'moves': self.moves,
+            'valid_moves': self.valid_moves(),
+            'ended': self.ended,
+            'result': self.result,
+        }
+
+
+class GameServer():
+    """
+    Hosts many games at once over a JSON-lines protocol: each request is a
+    JSON object on one line, and each response is one line with the same 'id'.
+    Requests are handled concurrently, so responses may arrive out of order.
+        {"op": "new", "engine": "c4-bitboard", "first": true, "max_depth": 5, "time_limit": null}
+            start a game; the AI moves first unless first is true
+        {"op": "move", "session": 1, "move": 38}
+            play a space (an index into the board, from 'valid_moves'); the AI replies
+        {"op": "state", "session": 1}
+        {"op": "close", "session": 1}
+            end a game, returning its latency metrics
+        {"op": "stats"}
+            server-wide latency metrics and cache counters
+    Searches run in a pool of worker processes. Each worker keeps one table
+    per engine for all the sessions it serves, and the server keeps a cache
+    of best moves by position shared by all sessions, which answers positions
+    searched before without using a worker. Sessions that reach a position
+    while it is being searched wait for that search instead of starting another.
+    """
+
+    DEFAULT_MAX_DEPTH: int = 5
+
+    def __init__(self, jobs: int = None, table_size: int = None, cache_size: int = None,
+                 executor: Executor = None):
+        self.executor = executor or ProcessPoolExecutor(jobs or os.cpu_count(), initializer=init_worker,
+                                                        initargs=(table_size,))
+        self.cache = PositionCache(cache_size)
+        # Searches for the cache that have not finished, by cache key
+        self.pending: Dict[tuple, asyncio.Future] = {}
+        self.joined = 0
+        self.sessions: Dict[int, Session] = {}
+        self.numbers = itertools.count(1)
+        self.metrics = LatencyMetrics()
+        self.search_metrics = LatencyMetrics()
+        self.started = 0
+        self.errors = 0
+
+    def close(self):
+        self.executor.shutdown()
+
+    async def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Response to one request.
+        """
+        start = time.perf_counter()
+        handlers = {'new': self.new_session, 'move': self.play_move, 'state': self.get_state,
+                    'close': self.close_session, 'stats': self.get_stats}
+        op = request.get('op')
+        try:
+            if op not in handlers:
+                raise ValueError(f'Unrecognized op: {op}')
+            response = await handlers[op](request)
+        except (KeyError, TypeError, ValueError, SearchFailed) as e:
+            self.errors += 1
+            message = f'Missing field: {e.args[0]}' if isinstance(e, KeyError) else str(e)
+            response = {'error': message}
+        if 'id' in request:
+            response['id'] = request['id']
+        latency = time.perf_counter() - start
+        response['latency'] = round(latency, 6)
+        if op in ('new', 'move') and 'error' not in response:
+            self.metrics.add(latency)
+        return response
+
+    def session(self, request: Dict[str, Any]) -> Session:
+        number = request['session']
+        if number not in self.sessions:
+            raise ValueError(f'Unknown session: {number}')
+        return self.sessions[number]
+
+    async def ai_turn(self, session: Session) -> Dict[str, Any]:
+        """Find and play the AI's move in session, returning how it was found.
+        Raises SearchFailed if the search fails, including for sessions waiting
+        on another session's search of the same position.
+        """
+        start = time.perf_counter()
+        try:
+            search = await self.find_search(session)
+        except Exception as e:
+            raise SearchFailed(f'Search failed: {type(e).__name__}: {e}') from e
+        session.play(search['move'], GameState.AI)
+        latency = time.perf_counter() - start
+        session.metrics.add(latency)
+        self.search_metrics.add(latency)
+        return search
+
+    async def find_search(self, session: Session) -> Dict[str, Any]:
+        """Result of the search for the AI's move in session, from the cache, a
+        search of the same position already running, or a new search.
+        """
+        loop = asyncio.get_running_loop()
+        if session.time_limit is not None:
+            search = await loop.run_in_executor(self.executor, search_position, session.engine,
+                                                list(session.board), session.max_depth, session.time_limit)
+            search = dict(search, cached=False)
+        else:
+            key = (session.engine, session.max_depth, tuple(session.board))
+            search = self.cache.lookup(key)
+            if search is not None:
+                search = dict(search, cached=True)
+            elif key in self.pending:
+                # Another session is already searching the same position
+                self.joined += 1
+                search = dict(await asyncio.shield(self.pending[key]), cached=True)
+            else:
+                future = loop.run_in_executor(self.executor, search_position, session.engine,
+                                              list(session.board), session.max_depth, None)
+                self.pending[key] = future
+                try:
+                    search = await future
+                finally:
+                    del self.pending[key]
+                self.cache.store(key, search)
+                search = dict(search, cached=False)
+        return search
+
+    async def new_session(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        engine = request['engine']
+        if engine not in ENGINES:
+            raise ValueError(f'Unrecognized engine: {engine}')
+        time_limit = request.get('time_limit')
+        # With a time limit, search as deep as time allows unless max_depth is also given
+        max_depth = request.get('max_depth', None if time_limit else self.DEFAULT_MAX_DEPTH)
+        first = request.get('first', True)
+        # Booleans are ints in Python, but not valid depths or time limits
+        if max_depth is not None and (type(max_depth) is not int or max_depth < 1):
+            raise ValueError(f'Invalid max_depth: {max_depth!r}, expected an integer of at least 1 or null')
+        if time_limit is not None and (type(time_limit) not in (int, float) or not time_limit > 0):
+            raise ValueError(f'Invalid time_limit: {time_limit!r}, expected a positive number or null')
+        if type(first) is not bool:
+            raise ValueError(f'Invalid first: {first!r}, expected true or false')
+
+        # The session is only registered once the AI's first move has been found,
+        # so a failed search leaves nothing behind
+        session = Session(next(self.numbers), engine, first, max_depth, time_limit)
+        response = {}
+        if not first:
+            response['search'] = await self.ai_turn(session)
+        self.sessions[session.number] = session
+        self.started += 1
+        response.update(session.view())
+        return response
+
+    async def play_move(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        session = self.session(request)
+        move = request['move']
+        # Booleans are ints in Python, and True would play space 1
+        if type(move) is not int:
+            raise ValueError(f'Invalid move: {move!r}, expected a space index')
+        async with session.lock:
+            if move not in session.valid_moves():
+                raise ValueError(f'Invalid move: {move}')
+            session.play(move, GameState.PLAYER)
+            response = {}
+            if not session.ended:
+                try:
+                    response['search'] = await self.ai_turn(session)
+                except BaseException:
+                    # Take the client's move back, so they can play it again
+                    session.take_back(move)
+                    raise
+            response.update(session.view())
+        return response
+
+    async def get_state(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return self.session(request).view()
+
+    async def close_session(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        session = self.session(request)
+        del self.sessions[session.number]
+        return {'session': session.number, 'metrics': session.metrics.summary()}
+
+    async def get_stats(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'sessions': len(self.sessions),
+            'started': self.started,
+            'errors': self.errors,
+            'requests': self.metrics.summary(),
+            'ai_moves': self.search_metrics.summary(),
+            'cache': {'entries': len(self.cache.entries), 'hits': self.cache.hits, 'misses': self.cache.misses,
+                      'joined': self.joined},
+        }
+
+    async def respond(self, line: str) -> str:
+        """Response line to a request line.
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('Expected a JSON object')
+        except ValueError as e:
+            self.errors += 1
+            return to_json_line({'error': f'Invalid request: {e}'})
+        return to_json_line(await self.handle(request))
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer the requests of one client connection until it closes.
+        """
+        tasks = set()
+
+        async def answer(line):
+            response = await self.respond(line)
+            writer.write(response.encode() + b'\n')
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(answer(line.decode()))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve_socket(self, host: str, port: int):
+        """Serve clients connecting to host:port until cancelled.
+        """
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self):
+        """Answer requests read from stdin, writing responses to stdout, until stdin closes.
+        """
+        loop = asyncio.get_running_loop()
+        tasks = set()
+
+        async def answer(line):
+            print(await self.respond(line), flush=True)
+
+        while True:
+            # Reading stdin blocks, so it runs in a thread
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.ensure_future(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
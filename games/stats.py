@@ -0,0 +1,68 @@
+from typing import Dict
+
+
+class SearchStats():
+    """
+    Counters collected by a search when requested:
+        nodes: states visited
+        terminals: ended states reached
+        heuristic_calls: states approximated by the heuristic at the depth limit
+        table_hits, table_misses: table lookups that did or did not find the state
+        table_cutoffs: table hits that returned a value without searching
+        cutoffs: number of alpha-beta cutoffs at each ply
+        depth: deepest ply reached
+        seconds: time spent searching
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.terminals = 0
+        self.heuristic_calls = 0
+        self.table_hits = 0
+        self.table_misses = 0
+        self.table_cutoffs = 0
+        self.cutoffs: Dict[int, int] = {}
+        self.depth = 0
+        self.seconds = 0.0
+
+    @property
+    def leaves(self) -> int:
+        """States whose value was not found by searching their children.
+        """
+        return self.terminals + self.heuristic_calls
+
+    def branching_factor(self) -> float:
+        """Effective branching factor: the b for which b ** depth == nodes.
+        """
+        return self.nodes ** (1 / self.depth) if self.depth and self.nodes else 0.0
+
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def merge(self, other: 'SearchStats'):
+        """Add the counts from other, e.g. a search run in another process.
+        Time is not added, since the searches may have run in parallel.
+        """
+        self.nodes += other.nodes
+        self.terminals += other.terminals
+        self.heuristic_calls += other.heuristic_calls
+        self.table_hits += other.table_hits
+        self.table_misses += other.table_misses
+        self.table_cutoffs += other.table_cutoffs
+        for ply, count in other.cutoffs.items():
+            self.cutoffs[ply] = self.cutoffs.get(ply, 0) + count
+        self.depth = max(self.depth, other.depth)
+
+    def report(self) -> str:
+        """Summary of the counters, for printing.
+        """
+        lookups = self.table_hits + self.table_misses
+        hit_rate = self.table_hits / lookups if lookups else 0.0
+        cutoffs = ', '.join(f'{ply}: {count}' for ply, count in sorted(self.cutoffs.items()))
+        return '\n'.join([
+            f'Nodes: {self.nodes} ({self.leaves} leaves, {self.heuristic_calls} heuristic calls)',
+            f'Depth: {self.depth}, effective branching factor: {self.branching_factor():.2f}',
+            f'Table: {self.table_hits} hits, {self.table_misses} misses ({hit_rate:.0%}), {self.table_cutoffs} cutoffs',
+            f'Cutoffs per ply: {cutoffs or "none"}',
+            f'Time: {self.seconds:.3f}s ({self.nodes_per_second():.0f} nodes/s)'
+        ])
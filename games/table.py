@@ -0,0 +1,125 @@
+import random
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Search depth recorded for values that were not approximated by a heuristic.
+# These are valid no matter how much depth remains in the current search.
+SOLVED_DEPTH: int = 1 << 16
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(num_spaces: int, pieces: Tuple[int, ...]) -> Tuple[Dict[int, List[int]], int]:
+    """Random 64-bit keys for each (piece, space) pair and for the side to move.
+    Seeded by board size so hashes are stable across runs and processes.
+    """
+    rand = random.Random(num_spaces)
+    keys = {piece: [rand.getrandbits(64) for _ in range(num_spaces)] for piece in pieces}
+    side_key = rand.getrandbits(64)
+    return keys, side_key
+
+
+class TranspositionTable():
+    """
+    Fixed-capacity cache of searched board states, keyed by Zobrist hash.
+    Each entry stores the value found by alpha-beta search along with:
+        flag: whether value is EXACT, a LOWER bound or an UPPER bound
+        depth: the remaining search depth that produced value
+        move: the best move found in the state (-1 if unknown)
+    Entries live in slot (key % capacity), in one typed array per field, so
+    the table takes ENTRY_BYTES per slot no matter how many states are stored.
+    The capacity is given in entries, or as a budget in bytes.
+    When a slot is taken by another state, policy decides which entry is kept:
+        DEPTH: replace entries not used by the current search, or searched
+               no deeper than the new entry (least recently used first)
+        ALWAYS: always keep the newest entry
+    """
+
+    EXACT: int = 0
+    LOWER: int = 1
+    UPPER: int = 2
+    # Flag of the same entry seen from the other player's point of view
+    OPPOSITE: Tuple[int, int, int] = (EXACT, UPPER, LOWER)
+
+    DEPTH: str = 'depth'
+    ALWAYS: str = 'always'
+
+    DEFAULT_CAPACITY: int = 1 << 20
+
+    # Typecodes of the arrays holding each field
+    FIELDS: Tuple[Tuple[str, str], ...] = (
+        ('keys', 'Q'), ('values', 'd'), ('flags', 'B'), ('depths', 'i'), ('moves', 'h'), ('generations', 'I')
+    )
+    FIELD_NAMES: Tuple[str, ...] = tuple(name for name, _ in FIELDS)
+    ENTRY_BYTES: int = sum(array(typecode).itemsize for _, typecode in FIELDS)
+
+    def __init__(self, capacity: int = None, max_bytes: int = None, policy: str = DEPTH):
+        if policy not in (self.DEPTH, self.ALWAYS):
+            raise ValueError(f'Unrecognized replacement policy: {policy}')
+        if max_bytes is not None:
+            # Round down so the table never takes more than max_bytes
+            capacity = 1 << max(max_bytes // self.ENTRY_BYTES, 2).bit_length() - 1
+        elif capacity is None:
+            capacity = self.DEFAULT_CAPACITY
+        # Round capacity up to a power of two so slots can be found by masking
+        self.capacity = 1 << max(capacity - 1, 1).bit_length()
+        self.mask = self.capacity - 1
+        self.policy = policy
+        self.keep_deeper = policy == self.DEPTH
+        # Generation 0 marks empty slots
+        self.generation = 1
+        self.size = 0
+
+    def __getattr__(self, name: str):
+        """Allocate the arrays when one is first used, so creating a table is instant.
+        Only called for attributes that are not set, so later uses cost nothing extra.
+        """
+        if name not in self.FIELD_NAMES:
+            raise AttributeError(name)
+        for field, typecode in self.FIELDS:
+            setattr(self, field, array(typecode, [0]) * self.capacity)
+        return getattr(self, name)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the entries.
+        """
+        return self.capacity * self.ENTRY_BYTES
+
+    def new_search(self):
+        """Mark existing entries as older than those stored from now on.
+        """
+        self.generation += 1
+
+    def lookup(self, key: int) -> Optional[Tuple[float, int, int, int]]:
+        """Get (value, flag, depth, move) stored for key, or None.
+        """
+        slot = key & self.mask
+        # Empty slots have key 0, which is also the hash of an empty board
+        if self.keys[slot] != key or not self.generations[slot]:
+            return None
+        # Entries used by the current search are kept like new ones
+        self.generations[slot] = self.generation
+        return self.values[slot], self.flags[slot], self.depths[slot], self.moves[slot]
+
+    def store(self, key: int, value: float, flag: int, depth: int, move: int):
+        """Save a searched value for key, subject to the replacement policy.
+        """
+        slot = key & self.mask
+        generations = self.generations
+        old_generation = generations[slot]
+        if not old_generation:
+            self.size += 1
+        elif (self.keep_deeper and old_generation == self.generation
+              and self.depths[slot] > depth and self.keys[slot] != key):
+            # Keep deeper entry from the current search
+            return
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.flags[slot] = flag
+        self.depths[slot] = depth
+        self.moves[slot] = move
+        generations[slot] = self.generation
@@ -0,0 +1,215 @@
+import mmap
+import os
+import random
+import struct
+import time
+from array import array
+from typing import List, Tuple
+
+from games import GameState
+from games.lines import line_tables
+
+
+class Tablebase():
+    """
+    Read-only, memory-mapped file of the exact result of every position of a
+    small Tic-Tac-Toe game, built by retrograde analysis (see build_tablebase).
+    The file is a header followed by one byte per board, at the board's index:
+    the board read as a base-3 number, where space i is worth 3 ** i and holds
+    0 (empty), 1 (a piece of the player who moved first) or 2 (a piece of the other player).
+        header: magic bytes, format version, board size, win length
+        entry: the result for the player to move (WIN, TIE or LOSS) in the top
+               two bits, or UNKNOWN for boards that cannot be reached, and the
+               number of moves left in the game in the rest
+    Results assume best play: the winner wins as fast as possible and the
+    loser loses as slowly as possible.
+    """
+
+    MAGIC: bytes = b'SGTB'
+    VERSION: int = 1
+    HEADER = struct.Struct('<4sIII')
+
+    UNKNOWN: int = 0
+    WIN: int = 1
+    TIE: int = 2
+    LOSS: int = 3
+    RESULT_SHIFT: int = 6
+    DISTANCE_MASK: int = (1 << RESULT_SHIFT) - 1
+
+    # Boards with more spaces have too many positions to enumerate
+    MAX_SPACES: int = 16
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.board_size, self.win_length = self.HEADER.unpack_from(self.data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f'Not a tablebase: {path}')
+        self.powers = [3 ** index for index in range(self.board_size ** 2)]
+
+    def matches(self, board_size: int, win_length: int) -> bool:
+        return self.board_size == board_size and self.win_length == win_length
+
+    def index(self, state: GameState) -> Tuple[int, int]:
+        """Index of state's board and the digit of the player to move's pieces.
+        """
+        board = state.board
+        player_count, ai_count = board.count(GameState.PLAYER), board.count(GameState.AI)
+        if player_count != ai_count:
+            first = GameState.PLAYER if player_count > ai_count else GameState.AI
+        else:
+            # With as many pieces each, the player to move moved first
+            first = -state.player
+        index = 0
+        for power, piece in zip(self.powers, board):
+            if piece != GameState.EMPTY:
+                index += power if piece == first else 2 * power
+        return index, 1 if player_count == ai_count else 2
+
+    def entry(self, index: int) -> Tuple[int, int]:
+        """(result, moves left) stored at index.
+        """
+        value = self.data[self.HEADER.size + index]
+        return value >> self.RESULT_SHIFT, value & self.DISTANCE_MASK
+
+    def probe(self, state: GameState) -> Tuple[int, int]:
+        """(result, moves left) for the player to move in state.
+        """
+        return self.entry(self.index(state)[0])
+
+    def best_move(self, state: GameState, rand: random.Random = None) -> int:
+        """A move for the player to move in state that keeps the best result,
+        reaching it in as few moves as possible if it is a win and as many if
+        it is a loss. rand breaks ties between equal moves, if given.
+        Returns -1 if the position is not in the tablebase.
+        """
+        index, digit = self.index(state)
+        best_moves, best_rank = [], None
+        for move in state.gen_indices():
+            result, distance = self.entry(index + digit * self.powers[move])
+            if result == self.UNKNOWN:
+                return -1
+            # The result of the move is the opposite of the other player's result after it
+            if result == self.LOSS:
+                rank = (2, -distance)
+            elif result == self.TIE:
+                rank = (1, 0)
+            else:
+                rank = (0, distance)
+            if best_rank is None or rank > best_rank:
+                best_moves, best_rank = [move], rank
+            elif rank == best_rank:
+                best_moves.append(move)
+        if not best_moves:
+            return -1
+        return rand.choice(best_moves) if rand else best_moves[0]
+
+    @classmethod
+    def describe(cls, result: int, distance: int) -> str:
+        """Result for the player to move, in words.
+        """
+        if result == cls.TIE:
+            return 'tie with best play'
+        # The player to move makes every other move
+        turns = (distance + 1) // 2
+        word = 'win' if result == cls.WIN else 'loss'
+        return f'{word} in {turns} move{"s" if turns != 1 else ""}'
+
+
+def build_tablebase(board_size: int, win_length: int, path: str, verbose: bool = True) -> int:
+    """Find the result of every reachable position of a board_size x board_size
+    game of win_length in a row by retrograde analysis, and write them to path.
+    Positions are found by playing every move from the empty board, one layer
+    per number of pieces. The results are then worked out from the last layer
+    back to the first, since a position's result only depends on the results
+    of the positions one move later.
+    Returns the number of positions in the tablebase.
+    """
+    spaces = board_size ** 2
+    if spaces > Tablebase.MAX_SPACES:
+        raise ValueError(f'Boards with more than {Tablebase.MAX_SPACES} spaces are too large for a tablebase')
+    powers = [3 ** index for index in range(spaces)]
+    full = (1 << spaces) - 1
+    lines, cell_lines = line_tables(board_size, board_size, win_length)
+    line_masks = [sum(1 << index for index in line) for line in lines]
+    cell_masks = [[line_masks[number] for number in cell_lines[index]] for index in range(spaces)]
+    shift = Tablebase.RESULT_SHIFT
+    start = time.perf_counter()
+
+    # Positions are packed into one int: a bitmask of each player's pieces and
+    # the board's index, which changes by digit * 3 ** space with each move
+    index_shift = 2 * spaces
+    # Boards reached but not yet solved are marked PENDING
+    PENDING = 0xFF
+    entries = bytearray(3 ** spaces)
+    layers: List[array] = [array('Q', [0])]
+    count = 1
+    for pieces in range(spaces):
+        next_layer = array('Q')
+        first_to_move = pieces % 2 == 0
+        digit = 1 if first_to_move else 2
+        for position in layers[pieces]:
+            first, second, index = position & full, position >> spaces & full, position >> index_shift
+            own = first if first_to_move else second
+            empty = full & ~(first | second)
+            while empty:
+                bit = empty & -empty
+                empty ^= bit
+                cell = bit.bit_length() - 1
+                child = index + digit * powers[cell]
+                if entries[child]:
+                    continue
+                count += 1
+                mover = own | bit
+                if any(mover & mask == mask for mask in cell_masks[cell]):
+                    # The player to move in the child has lost
+                    entries[child] = Tablebase.LOSS << shift
+                elif pieces + 1 == spaces:
+                    entries[child] = Tablebase.TIE << shift
+                else:
+                    entries[child] = PENDING
+                    next_layer.append((position | (bit if first_to_move else bit << spaces))
+                                      + (digit * powers[cell] << index_shift))
+        layers.append(next_layer)
+        if verbose:
+            print(f'{pieces + 1} pieces: {len(next_layer)} positions to solve ({time.perf_counter() - start:.1f}s)')
+
+    # Work backwards from the last layer
+    for pieces in range(spaces - 1, -1, -1):
+        digit = 1 if pieces % 2 == 0 else 2
+        for position in layers[pieces]:
+            index = position >> index_shift
+            empty = full & ~(position | position >> spaces)
+            fastest_win, slowest_loss, tie = None, 0, False
+            while empty:
+                bit = empty & -empty
+                empty ^= bit
+                value = entries[index + digit * powers[bit.bit_length() - 1]]
+                result, distance = value >> shift, value & Tablebase.DISTANCE_MASK
+                if result == Tablebase.LOSS:
+                    if fastest_win is None or distance < fastest_win:
+                        fastest_win = distance
+                elif result == Tablebase.TIE:
+                    tie = True
+                elif distance > slowest_loss:
+                    slowest_loss = distance
+            if fastest_win is not None:
+                entries[index] = Tablebase.WIN << shift | fastest_win + 1
+            elif tie:
+                # A tie is only reached when the board is full
+                entries[index] = Tablebase.TIE << shift | spaces - pieces
+            else:
+                entries[index] = Tablebase.LOSS << shift | slowest_loss + 1
+        # The positions of this layer are no longer needed
+        layers[pieces] = None
+        if verbose:
+            print(f'Solved positions with {pieces} pieces ({time.perf_counter() - start:.1f}s)')
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(Tablebase.HEADER.pack(Tablebase.MAGIC, Tablebase.VERSION, board_size, win_length))
+        f.write(entries)
+    return count
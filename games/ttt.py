@@ -1,55 +1,45 @@
 
-import random
-from typing import Any, Dict, Generator, List
+import os
+from typing import Tuple
 
-from games import Game, GameState
+from games import Game, GameConfig, GameState
+from games.book import BOOK_DIR
+from games.lines import board_symmetries
+from games.mnk import MNKGameState
+from games.stats import SearchStats
+from games.tablebase import Tablebase
 
 
-class TTTGameState(GameState):
+class TTTGameState(MNKGameState):
     """
     Representation of a specific board state.
     player: the player that played last_move
     board: the current board state
     board_size: the number of spaces per row (and col)
+    win_length: the number of pieces in a row that wins (board_size by default)
     last_move: the index of the last move made by player
+    Tic-Tac-Toe is the m,n,k-game on a square board, so the rest of the
+    engine is MNKGameState's.
     """
 
-    max_depth = None
-
-    def __init__(self, player: int, board: Any, board_values: Dict[int, float],
-                 last_move: int, kwargs: Dict[str, Any] = None):
-        super().__init__(player, board, board_values, last_move, kwargs=kwargs)
-        if last_move == -1:
-            return
-
-        # Determine if the game has ended
-        # Enumerate the indices of the possible winning lines
-        board_size = kwargs['board_size']
-        row, col = divmod(last_move, board_size)
-        winning_lines = []
-        # Add row of last_move
-        winning_lines.append(list(range(board_size * row, board_size * (row + 1))))
-        # Add col of last_move
-        winning_lines.append(list(range(col, col + board_size ** 2, board_size)))
-        # Add top left to bottom right diagonal
-        if row == col:
-            winning_lines.append(list(range(0, board_size ** 2, board_size + 1)))
-        # Add top right to bottom left diagonal
-        if row + col == board_size - 1:
-            winning_lines.append(list(range(board_size - 1, board_size ** 2 - 1, board_size - 1)))
-
-        # Check if last move ended the game
-        self.win = any(all(self.board[index] == self.player for index in line) for line in winning_lines)
-        self.tie = not self.win and all(space != GameState.EMPTY for space in self.board)
-        self.ended = self.win or self.tie
-
-    def gen_indices(self) -> Generator[int, None, None]:
-        """Generator of valid move indices for AI.
+    __slots__ = ()
+
+    @classmethod
+    def init_config(cls, config: GameConfig):
+        """Read the board size from kwargs and precompute the board's tables.
+        """
+        config.board_size = config.kwargs['board_size']
+        config.rows = config.cols = config.board_size
+        config.win_length = config.kwargs.get('win_length') or config.board_size
+        cls.init_lines(config)
+
+    @classmethod
+    def symmetry_maps(cls, config: GameConfig) -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[Tuple[int, ...], ...]]:
+        """Index maps for the rotations and reflections of the board, and their inverses.
         """
-        n = len(self.board)
-        for index in random.sample(range(n), n):
-            if self.board[index] == GameState.EMPTY:
-                yield index
+        board_size = config.kwargs['board_size']
+        return board_symmetries(board_size, board_size, False)
+
 
 class TTTGame(Game):
     # Player markers
@@ -58,18 +48,53 @@ class TTTGame(Game):
 
     gamestate_cls = TTTGameState
 
-    def __init__(self, player_first: bool, board_size: int = 3, **kwargs):
+    def __init__(self, player_first: bool, board_size: int = 3, max_depth: int = 5,
+                 win_length: int = None, use_tablebase: bool = True, **kwargs):
         self.board = [GameState.EMPTY] * (board_size ** 2)
         self.board_size = board_size
+        # By default a player needs a full row, column or diagonal to win
+        self.win_length = win_length or board_size
+        if not 1 <= self.win_length <= board_size:
+            raise ValueError(f'Win length must be between 1 and {board_size}')
         self.gamestate_cls.max_depth = max_depth
 
-        self.kwargs = {'board_size': board_size}
-        super().__init__(player_first)
+        self.kwargs = {'board_size': board_size, 'win_length': self.win_length}
+
+        # Look up every move in the tablebase instead of searching, if one has been built
+        self.tablebase = None
+        if use_tablebase:
+            path = os.path.join(BOOK_DIR, self.book_name() + '.tb')
+            if os.path.exists(path):
+                tablebase = Tablebase(path)
+                # The file may have been copied or renamed from another board's tablebase
+                if tablebase.matches(board_size, self.win_length):
+                    self.tablebase = tablebase
+                else:
+                    print(f'Ignoring {path}: it is the tablebase of a different board')
+        super().__init__(player_first, **kwargs)
+
+    def book_name(self) -> str:
+        """Name of the opening book file for this game and its options.
+        """
+        if self.win_length == self.board_size:
+            return f'ttt{self.board_size}'
+        return f'ttt{self.board_size}k{self.win_length}'
+
+    def find_move(self, state: GameState, stats: SearchStats = None) -> int:
+        """Look up the AI's best move in the tablebase, which is exact and so
+        comes before the opening book, or find it as usual without one.
+        """
+        move = self.tablebase.best_move(state, self.orderer.rand) if self.tablebase else -1
+        if move == -1:
+            return super().find_move(state, stats)
+        if self.show_stats:
+            print(f'Tablebase: {self.tablebase.describe(*self.tablebase.probe(state))} for me')
+        return move
 
     def move_is_valid(self, move: int) -> bool:
         """Check that move choice is valid.
         """
-        return 1 <= move <= 9
+        return 1 <= move <= self.board_size ** 2
 
     def move_to_index(self, move: int) -> int:
         """Convert move choice to index in self.board
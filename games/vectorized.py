@@ -0,0 +1,55 @@
+from typing import Sequence, Tuple
+
+# NumPy is optional: without it, states evaluate their leaves one at a time
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def available() -> bool:
+    """Check if NumPy is installed, so leaves can be evaluated in batches.
+    """
+    return np is not None
+
+
+class LineEvaluator():
+    """
+    Scores every move from a state at once by the lines each player can
+    still complete, giving the same values as MNKGameState.heuristic.
+    Built once per game config:
+        incidence: for each space, 1 for each line through it and 0 for the rest
+        points: points for a line, from the AI's point of view, indexed by
+                (AI pieces in the line) * stride + (player pieces in the line)
+    A move only changes the points of the lines through it, so the score after
+    each move is the state's score plus the incidence matrix times the change
+    in each line's points, which is one matrix-vector product for every move.
+    Scores are whole numbers well within the range floats hold exactly.
+    """
+
+    def __init__(self, lines: Tuple[Tuple[int, ...], ...], num_spaces: int,
+                 weights: Sequence[int], scale: int):
+        self.incidence = np.zeros((num_spaces, len(lines)))
+        for number, line in enumerate(lines):
+            self.incidence[list(line), number] = 1
+        # Lines holding only one player's pieces count for that player
+        self.stride = len(weights)
+        points = np.zeros(self.stride * self.stride)
+        for count in range(1, self.stride):
+            points[count * self.stride] = weights[count]
+            points[count] = -weights[count]
+        self.points = points
+        self.scale = scale
+
+    def evaluate(self, ai_counts: Sequence[int], player_counts: Sequence[int], mover_is_ai: bool) -> list:
+        """Heuristic values, from the AI's point of view, of the states reached by
+        the mover playing each space, indexed by board index. Values for
+        occupied spaces are meaningless.
+        ai_counts and player_counts are the pieces of each player in each line.
+        """
+        ai = np.frombuffer(ai_counts, dtype=np.uint8).astype(np.intp)
+        base = ai * self.stride + np.frombuffer(player_counts, dtype=np.uint8)
+        before = self.points[base]
+        change = self.points[base + (self.stride if mover_is_ai else 1)] - before
+        scores = before.sum() + self.incidence @ change
+        return (scores / (np.abs(scores) + self.scale)).tolist()
@@ -1,17 +1,31 @@
+import importlib
 import random
 import sys
 import time
+from typing import Tuple
 
 from games import GameState
-from games.ttt import TTTGame
-from games.c4 import C4Game
 
+# Game classes by name, as module and class names, so only the chosen game is imported
 game_cls = {
-    'ttt': TTTGame,
-    'c4': C4Game
+    'ttt': ('games.ttt', 'TTTGame'),
+    'c4': ('games.c4', 'C4Game'),
+    'mnk': ('games.mnk', 'MNKGame')
 }
 
-def coin_flip():
+def load_game(name: str) -> type:
+    """Import the module of a game in game_cls and return its class.
+    """
+    module, cls = game_cls[name]
+    return getattr(importlib.import_module(module), cls)
+
+def board_dims(value: str) -> Tuple[int, int]:
+    """Rows and columns given by -d: one number for a square board, or <rows>x<cols>.
+    """
+    rows, _, cols = value.lower().partition('x')
+    return int(rows), int(cols or rows)
+
+def coin_flip(animation: bool = True):
     print('Who goes first?')
     # Make sure the player makes a valid guess
     while True:
@@ -26,25 +40,53 @@ def coin_flip():
     flip = random.choice(['h' ,'t'])
 
     # Print a nice flip animation
-    states = ['_', '  \\', '    |', '     /', '      _', '      \\', '      |', '      /']
-    print('Flipping...')
-    for s in states:
-        time.sleep(0.15)
-        print('\t   ', s)
+    if animation:
+        states = ['_', '  \\', '    |', '     /', '      _', '      \\', '      |', '      /']
+        print('Flipping...')
+        for s in states:
+            time.sleep(0.15)
+            print('\t   ', s)
     if flip == 'h':
         print('\t      Heads!')
     else:
         print('\t      Tails!')
-    time.sleep(0.5)
+    if animation:
+        time.sleep(0.5)
     print()
 
     # Player goes first if guess is correct
     return guess == flip
 
 def usage():
-    print(f'Usage: python3 {sys.argv[0]} <game> [-m <max depth>] [-d <board size>]')
+    print(f'Usage: python3 {sys.argv[0]} <game> [-m <max depth>] [-d <board size>] [-k <length>] [-t <seconds>] [-r] [-s <seed>] [-j <jobs>] [-b] [--stats] [-c <entries>] [--memory <MB>]')
+    print('                         [-a <algorithm>] [-w <width>] [--solve] [--weak] [-p] [--numpy]')
+    print('                         [-f <first>] [--no-animation] [-g]')
     print('    Tic-Tac-Toe: \'ttt\'. Default options: -m 5 -d 3')
+    print('        -k: number in a row needed to win, at most the board size. Default: the board size')
     print('    Connect 4: \'c4\'. Default optionss: -m 5')
+    print('    m,n,k-game: \'mnk\', k in a row on any board. Default options: -m 5 -d 3')
+    print('        -d: <rows>x<cols> for a rectangular board, e.g. -d 7x8')
+    print('        -k: Default: the length of the board\'s shorter side')
+    print('        -g: gravity: pieces drop to the lowest empty space of a column, as in Connect 4')
+    print('    -t: search with iterative deepening for at most this many seconds per move')
+    print('    -r: randomly choose between equally good moves')
+    print('    -s: seed for -r, to make the AI\'s choices repeatable')
+    print('    -j: number of processes searching each move')
+    print('    -b: use the bitboard engine (Connect 4 only)')
+    print('    --stats: print search statistics after each of the AI\'s moves')
+    print('    -c: number of board states the AI remembers, rounded up to a power of two. Default: 1048576')
+    print('    --memory: memory for remembered board states in megabytes, instead of -c')
+    print('        (each process started by -j takes as much again)')
+    print('    -a: search algorithm: \'alphabeta\', \'negamax\' or \'pvs\'. Default: pvs')
+    print('    -w: with -t, first search each iteration with a window this wide around the last value')
+    print('    --solve: play perfectly by solving each position exactly (Connect 4 only),')
+    print('        searching as usual if it cannot be solved in -t seconds (default 10)')
+    print('    --weak: with --solve, only solve for win, loss or tie, which is faster')
+    print('    -p: ponder: search your likely moves while you choose one, so the AI answers faster (not with -j)')
+    print('    --numpy: score positions at max-depth in batches with NumPy, if it is installed,')
+    print('        which is faster on large Tic-Tac-Toe boards')
+    print('    -f: who moves first instead of flipping a coin: \'me\' or \'ai\'')
+    print('    --no-animation: flip the coin without the animation')
 
 def main():
     # Check args for game argument
@@ -55,23 +97,67 @@ def main():
         sys.exit(0)
 
     # Get optional values
-    max_depth = int(sys.argv[sys.argv.index('-m') + 1]) if '-m' in sys.argv else 5
-    board_size = int(sys.argv[sys.argv.index('-d') + 1]) if '-d' in sys.argv else 3
+    time_limit = float(sys.argv[sys.argv.index('-t') + 1]) if '-t' in sys.argv else None
+    # With a time limit, search as deep as time allows unless -m is also given
+    max_depth = int(sys.argv[sys.argv.index('-m') + 1]) if '-m' in sys.argv else (None if time_limit else 5)
+    rows, cols = board_dims(sys.argv[sys.argv.index('-d') + 1]) if '-d' in sys.argv else (3, 3)
+    win_length = int(sys.argv[sys.argv.index('-k') + 1]) if '-k' in sys.argv else None
+    gravity = '-g' in sys.argv
+    randomize = '-r' in sys.argv
+    seed = int(sys.argv[sys.argv.index('-s') + 1]) if '-s' in sys.argv else None
+    jobs = int(sys.argv[sys.argv.index('-j') + 1]) if '-j' in sys.argv else 1
+    bitboard = '-b' in sys.argv
+    show_stats = '--stats' in sys.argv
+    table_size = int(sys.argv[sys.argv.index('-c') + 1]) if '-c' in sys.argv else None
+    table_bytes = int(float(sys.argv[sys.argv.index('--memory') + 1]) * (1 << 20)) if '--memory' in sys.argv else None
+    search_algorithm = sys.argv[sys.argv.index('-a') + 1] if '-a' in sys.argv else None
+    aspiration_window = float(sys.argv[sys.argv.index('-w') + 1]) if '-w' in sys.argv else None
+    solve = '--solve' in sys.argv
+    weak = '--weak' in sys.argv
+    ponder = '-p' in sys.argv
+    batch_leaves = '--numpy' in sys.argv
+    first = sys.argv[sys.argv.index('-f') + 1] if '-f' in sys.argv else None
+    animation = '--no-animation' not in sys.argv
+    if first not in (None, 'me', 'ai'):
+        print(f'Unrecognized first player: {first}')
+        usage()
+        sys.exit(0)
+    if rows != cols and game != 'mnk':
+        print('Only m,n,k-games can be played on rectangular boards')
+        usage()
+        sys.exit(0)
+    if search_algorithm is not None and search_algorithm not in GameState.SEARCH_ALGORITHMS:
+        print(f'Unrecognized search algorithm: {search_algorithm}')
+        usage()
+        sys.exit(0)
+    if batch_leaves:
+        from games.vectorized import available
+        if not available():
+            print('NumPy is not installed, so positions will be scored one at a time')
+            batch_leaves = False
 
     # Decide who goes first
-    player_turn = coin_flip()
+    player_turn = coin_flip(animation) if first is None else first == 'me'
+    game_class = load_game(game)
     if player_turn:
-        print(f'You are {game_cls[game].FIRST}')
+        print(f'You are {game_class.FIRST}')
     else:
-        print(f'You are {game_cls[game].SECOND}')
+        print(f'You are {game_class.SECOND}')
 
     # Create new Game
-    game = game_cls[game](player_turn, max_depth=max_depth, board_size=board_size)
+    game = game_class(player_turn, max_depth=max_depth, board_size=rows, rows=rows, cols=cols,
+                         win_length=win_length, gravity=gravity,
+                         time_limit=time_limit, randomize=randomize, seed=seed, jobs=jobs,
+                         bitboard=bitboard, show_stats=show_stats, table_size=table_size,
+                         table_bytes=table_bytes, search_algorithm=search_algorithm,
+                         aspiration_window=aspiration_window, solve=solve, weak=weak,
+                         ponder=ponder, batch_leaves=batch_leaves)
 
     # Keep playing while game has not ended
     while not game.ended:
         # Make sure the player inputs a valid move
         game.print_board()
+        game.start_pondering()
         move_str = input('Your turn! Play a space: ').strip()
         try:
             if move_str.lower().startswith('q'):
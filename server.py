@@ -0,0 +1,48 @@
+import asyncio
+import sys
+
+from games.engines import ENGINES
+from games.server import GameServer
+
+
+def usage():
+    print(f'Usage: python3 {sys.argv[0]} [--port <port>] [--host <host>] [-j <jobs>] [-c <entries>] [--cache <entries>]')
+    print(f'    Engines: {", ".join(ENGINES)}')
+    print('    Serve games over a JSON-lines protocol, one request and one response per line:')
+    print('        {"op": "new", "engine": "c4-bitboard", "first": true, "max_depth": 5, "time_limit": null}')
+    print('        {"op": "move", "session": 1, "move": 38}')
+    print('        {"op": "state", "session": 1}')
+    print('        {"op": "close", "session": 1}')
+    print('        {"op": "stats"}')
+    print('    Requests may have an "id", which is copied to the response.')
+    print('    --port: listen for connections on this port instead of reading stdin and writing stdout')
+    print('    --host: address to listen on with --port. Default: 127.0.0.1')
+    print('    -j: number of processes searching for the AI\'s moves. Default: one per CPU')
+    print('    -c: number of board states each process remembers per engine. Default: 1048576')
+    print('    --cache: number of positions whose best moves are shared between sessions. Default: 65536')
+
+def main():
+    # Get optional values
+    port = int(sys.argv[sys.argv.index('--port') + 1]) if '--port' in sys.argv else None
+    host = sys.argv[sys.argv.index('--host') + 1] if '--host' in sys.argv else '127.0.0.1'
+    jobs = int(sys.argv[sys.argv.index('-j') + 1]) if '-j' in sys.argv else None
+    table_size = int(sys.argv[sys.argv.index('-c') + 1]) if '-c' in sys.argv else None
+    cache_size = int(sys.argv[sys.argv.index('--cache') + 1]) if '--cache' in sys.argv else None
+
+    server = GameServer(jobs, table_size, cache_size)
+    try:
+        if port is not None:
+            print(f'Listening on {host}:{port}', file=sys.stderr)
+            asyncio.run(server.serve_socket(host, port))
+        else:
+            asyncio.run(server.serve_stdio())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+if __name__ == '__main__':
+    if '-h' in sys.argv or 'help' in sys.argv:
+        usage()
+        sys.exit(0)
+    main()